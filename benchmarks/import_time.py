@@ -0,0 +1,78 @@
+"""Import-time regression check for CLI startup.
+
+Runs tube.py commands under `python -X importtime` in a scratch directory and
+fails if a command imports modules it shouldn't need, or if its cumulative
+import time exceeds a budget.
+
+Usage: python benchmarks/import_time.py [--budget-ms=50]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules each command must not import, e.g. help shouldn't pull in HTTP or SQLite code
+FORBIDDEN = {
+    ("help",): ["requests", "urllib3", "sqlite3", "tubearchivist_cli.api", "tubearchivist_cli.cache"],
+    ("stats",): ["requests", "urllib3", "tubearchivist_cli.api"],
+    ("search", "videos", "test"): ["requests", "urllib3", "tubearchivist_cli.api"],
+}
+
+
+def import_times(args, cwd):
+    """Run tube.py with -X importtime and return (modules, top-level package import microseconds)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", str(ROOT / "tube.py"), *args],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+    )
+    modules = set()
+    package_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        name = module.strip()
+        modules.add(name)
+        # Unindented entries are imports started directly by the CLI; their cumulative
+        # time already includes everything they pulled in
+        if module.startswith(" ") and not module.startswith("  ") and name.startswith("tubearchivist_cli"):
+            package_us += int(cumulative)
+    return modules, package_us
+
+
+def main():
+    budget_ms = 50
+    for arg in sys.argv[1:]:
+        if arg.startswith("--budget-ms="):
+            budget_ms = float(arg.split("=", 1)[1])
+
+    failures = []
+    with tempfile.TemporaryDirectory() as cwd:
+        for args, forbidden in FORBIDDEN.items():
+            modules, package_us = import_times(args, cwd)
+            command = " ".join(args)
+            total_ms = package_us / 1000
+            print(f"tube {command}: {len(modules)} modules, {total_ms:.1f} ms in tubearchivist_cli imports")
+
+            for prefix in forbidden:
+                imported = [module for module in modules if module == prefix or module.startswith(prefix + ".")]
+                if imported:
+                    failures.append(f"tube {command} imports {prefix}")
+            if total_ms > budget_ms:
+                failures.append(f"tube {command} import time {total_ms:.1f} ms exceeds {budget_ms} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
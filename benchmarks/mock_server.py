@@ -0,0 +1,283 @@
+"""Local stand-in for the TubeArchivist API, serving a synthetic library.
+
+Implements the endpoints the CLI uses: /api/ping/, paginated /api/video/,
+/api/channel/ and /api/playlist/ listings, and POST /api/download/. Items are
+generated deterministically from their index on request, so a library of a
+million videos costs no memory. Responses are gzipped when the client accepts it.
+The tests use fail() to inject error responses, and read back the requests seen.
+
+Usage: python benchmarks/mock_server.py [--videos=10000] [--latency-ms=0] [--port=8000]
+"""
+import gzip
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+LANGUAGES = ["en", "de", "fr", "es", "ja", "pt"]
+WORDS = ["cats", "dogs", "music", "live", "tutorial", "review", "python", "travel", "cooking", "news",
+         "guitar", "science", "space", "history", "football", "linux", "podcast", "documentary"]
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "ta", "vo", "shi", "ben", "dor", "gal", "pex", "tor", "qui", "zan"]
+# A few thousand words with Zipf-distributed frequencies, so searches match like they would in real text
+VOCABULARY = WORDS + ["".join(parts) for parts in itertools.product(SYLLABLES, repeat=3)]
+CUMULATIVE_WEIGHTS = list(itertools.accumulate(1 / rank for rank in range(1, len(VOCABULARY) + 1)))
+KINDS = {"video": 0, "channel": 1, "playlist": 2}
+# Heights in the proportions a typical archive has them
+HEIGHTS = [360, 480, 720, 720, 1080, 1080, 1080, 1440, 2160]
+BASE_TIMESTAMP = 1600000000
+
+
+class MockLibrary:
+    """Synthetic videos, channels and playlists, generated from their index"""
+
+    def __init__(self, videos=10000, channels=None, playlists=None):
+        self.sizes = {
+            "video": videos,
+            "channel": channels if channels is not None else max(10, videos // 100),
+            "playlist": playlists if playlists is not None else max(5, videos // 50),
+        }
+        # Long texts come from a fixed pool; generating them per item would make the server the bottleneck
+        rng = random.Random(0)
+        self.texts = [self._words(rng, rng.randint(10, 200)) for _ in range(1024)]
+
+    def item(self, kind, index):
+        return getattr(self, f"_{kind}")(index, random.Random(index * len(KINDS) + KINDS[kind]))
+
+    def _words(self, rng, count):
+        return " ".join(rng.choices(VOCABULARY, cum_weights=CUMULATIVE_WEIGHTS, k=count))
+
+    def _text(self, rng):
+        return self.texts[rng.randrange(len(self.texts))]
+
+    def _channel_ref(self, index):
+        channel = index % self.sizes["channel"]
+        return {"channel_id": f"UC{channel:022d}", "channel_name": f"Channel {channel}"}
+
+    def _video(self, index, rng):
+        height = rng.choice(HEIGHTS)
+        duration = rng.randint(60, 7200)
+        youtube_id = f"v{index:010d}"
+        return {
+            "youtube_id": youtube_id,
+            "title": f"{self._words(rng, 5).capitalize()} {index}",
+            "description": self._text(rng),
+            "published": time.strftime("%Y-%m-%d", time.gmtime(BASE_TIMESTAMP - index * 3600)),
+            "date_downloaded": BASE_TIMESTAMP + index,
+            "active": rng.random() > 0.02,
+            "vid_last_refresh": BASE_TIMESTAMP + index,
+            "vid_thumb_url": f"/cache/videos/{youtube_id[:1]}/{youtube_id}.jpg",
+            "vid_type": "videos",
+            "media_url": f"/media/{youtube_id}.mp4",
+            "media_size": rng.randint(10, 4000) * 1024 * 1024,
+            "comment_count": rng.randint(0, 5000),
+            "category": [rng.choice(["Music", "Education", "Entertainment"])],
+            "tags": self._words(rng, rng.randint(0, 8)).split(),
+            "channel": self._channel_ref(index),
+            "player": {"watched": rng.random() > 0.5, "duration": duration,
+                       "duration_str": time.strftime("%H:%M:%S", time.gmtime(duration))},
+            "playlist": [],
+            "sponsorblock": None,
+            "stats": {"view_count": rng.randint(0, 10 ** 7), "like_count": rng.randint(0, 10 ** 5),
+                      "dislike_count": 0, "average_rating": None},
+            "streams": [
+                {"type": "video", "index": 0, "codec": rng.choice(["avc1", "vp9", "av01"]),
+                 "width": height * 16 // 9, "height": height, "bitrate": height * rng.randint(1500, 4000)},
+                {"type": "audio", "index": 1, "codec": rng.choice(["mp4a", "opus"]),
+                 "bitrate": rng.choice([128000, 160000, 256000])},
+            ],
+            "subtitles": [
+                {"ext": "vtt", "url": f"https://www.youtube.com/api/timedtext?v={youtube_id}&lang={lang}",
+                 "name": lang.upper(), "lang": lang, "source": rng.choice(["user", "auto"]),
+                 "media_url": f"/media/{youtube_id}.{lang}.vtt"}
+                for lang in rng.sample(LANGUAGES, rng.randint(0, 4))
+            ],
+            "_index": "ta_video",
+            "_score": 0,
+        }
+
+    def _channel(self, index, rng):
+        ref = self._channel_ref(index)
+        return {
+            **ref,
+            "channel_banner_url": f"/cache/channels/{ref['channel_id']}_banner.jpg",
+            "channel_thumb_url": f"/cache/channels/{ref['channel_id']}_thumb.jpg",
+            "channel_description": self._text(rng),
+            "channel_last_refresh": BASE_TIMESTAMP + index,
+            "channel_subscribed": rng.random() > 0.3,
+            "channel_overwrites": {},
+            "date_downloaded": BASE_TIMESTAMP + index,
+            "active": True,
+            "_index": "ta_channel",
+            "_score": 0,
+        }
+
+    def _playlist(self, index, rng):
+        videos = self.sizes["video"]
+        start = rng.randrange(videos) if videos else 0
+        return {
+            "playlist_id": f"PL{index:032d}",
+            "playlist_name": f"{self._words(rng, 3).capitalize()} playlist {index}",
+            "playlist_description": self._text(rng),
+            "playlist_channel": self._channel_ref(index)["channel_name"],
+            "playlist_channel_id": self._channel_ref(index)["channel_id"],
+            "playlist_thumbnail": f"/cache/playlists/{index}.jpg",
+            "playlist_last_refresh": BASE_TIMESTAMP + index,
+            "playlist_entries": [
+                {"youtube_id": f"v{(start + i) % videos:010d}", "idx": i, "downloaded": True}
+                for i in range(min(videos, rng.randint(1, 200)))
+            ],
+            "date_downloaded": BASE_TIMESTAMP + index,
+            "active": True,
+            "_index": "ta_playlist",
+            "_score": 0,
+        }
+
+    def page(self, kind, page, page_size, descending=False):
+        total = self.sizes[kind]
+        last_page = max(1, -(-total // page_size))
+        indexes = range((page - 1) * page_size, min(total, page * page_size))
+        if descending:
+            indexes = [total - 1 - index for index in indexes]
+        return {
+            "data": [self.item(kind, index) for index in indexes],
+            "paginate": {
+                "page_size": page_size,
+                "current_page": page,
+                "last_page": last_page,
+                "total_hits": total,
+                "prev_pages": list(range(max(1, page - 5), page)),
+                "next_pages": list(range(page + 1, min(last_page, page + 5) + 1)),
+            },
+        }
+
+
+class MockServer:
+    """Run a MockLibrary behind a threaded HTTP server, in the background or the foreground"""
+
+    def __init__(self, library, latency_ms=0, port=0, jitter_ms=0):
+        self.library = library
+        self.latency = latency_ms / 1000
+        # Random extra latency per request, so concurrent responses arrive out of order
+        self.jitter = jitter_ms / 1000
+        self.queued = 0
+        self.batches = []
+        self.requests = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.failures = deque()
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def fail(self, status, count=1, retry_after=None):
+        """Answer the next `count` requests with `status`, optionally sending a Retry-After header"""
+        headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+        with self.lock:
+            self.failures.extend([(status, headers)] * count)
+
+    def _begin(self, method, path):
+        """Count a request and return the failure to answer it with, if one is queued"""
+        with self.lock:
+            self.requests[f"{method} {path}"] += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return self.failures.popleft() if self.failures else None
+
+    def _end(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                failure = server._begin("GET", url.path)
+                try:
+                    self._get(url, failure)
+                finally:
+                    server._end()
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                failure = server._begin("POST", urlparse(self.path).path)
+                try:
+                    self._sleep()
+                    if failure:
+                        return self._send({"detail": "Injected failure."}, *failure)
+                    with server.lock:
+                        server.queued += len(body.get("data", []))
+                        server.batches.append(len(body.get("data", [])))
+                    self._send(body)
+                finally:
+                    server._end()
+
+            def _sleep(self):
+                time.sleep(server.latency + random.uniform(0, server.jitter))
+
+            def _get(self, url, failure):
+                query = parse_qs(url.query)
+                kind = url.path.strip("/").split("/")[-1]
+                self._sleep()
+                if failure:
+                    return self._send({"detail": "Injected failure."}, *failure)
+                if kind == "ping":
+                    return self._send({"response": "pong"})
+                if kind not in server.library.sizes:
+                    return self._send({"detail": "Not found."}, status=404)
+                page = int(query.get("page", ["1"])[0])
+                page_size = int(query.get("page_size", ["12"])[0])
+                descending = query.get("order", ["asc"])[0] == "desc"
+                self._send(server.library.page(kind, page, page_size, descending))
+
+            def _send(self, payload, status=200, headers=None):
+                body = json.dumps(payload).encode()
+                gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+                if gzipped:
+                    body = gzip.compress(body, compresslevel=1)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                if gzipped:
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    options = dict(arg[2:].partition("=")[::2] for arg in sys.argv[1:] if arg.startswith("--"))
+    library = MockLibrary(videos=int(options.get("videos", 10000)))
+    server = MockServer(library, latency_ms=float(options.get("latency-ms", 0)), port=int(options.get("port", 8000)))
+    print(f"Serving {library.sizes} at {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Benchmark suite for sync, search, stats and redownload against a synthetic library.
+
+Starts the stand-in server from benchmarks/mock_server.py, then for each library size:
+- writes the same videos into the cache one add_video() call per row and then in
+  batches through add_videos(), reporting rows/s for each and the speedup
+- runs `tube.py sync all` in a fresh cache, recording wall time, rows/s and the
+  process's peak RSS, then the same for `sync all --incremental`
+- times Search and Stats commands in-process and reports latency percentiles
+- queues videos for redownload and reports the submission rate
+
+Results are written as JSON together with the git revision and library versions,
+so runs can be compared between versions with --compare.
+
+Usage: python benchmarks/suite.py [--videos=10000,100000] [--latency-ms=0] [--concurrency=4]
+                                  [--repeat=20] [--redownload=5000] [--inserts=5000]
+                                  [--output=benchmark-results.json] [--compare=previous.json]
+"""
+import contextlib
+import io
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.mock_server import MockLibrary, MockServer, VOCABULARY  # noqa: E402
+
+# Common, mid-frequency and rare words, a prefix, and multi-word queries
+SEARCH_QUERIES = ["cats", "music", VOCABULARY[100], VOCABULARY[1000], VOCABULARY[3000], "kalo", "doc",
+                  "python tutorial", f"{VOCABULARY[200]} {VOCABULARY[40]}", "playlist 12"]
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda fraction: ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": ordered[-1] * 1000}
+
+
+def run_cli(args, cwd):
+    """Run tube.py to completion, returning (seconds, peak RSS in bytes)"""
+    started = time.perf_counter()
+    with open(Path(cwd) / "benchmark.log", "a") as log:
+        process = subprocess.Popen(
+            [sys.executable, str(ROOT / "tube.py"), *args],
+            cwd=cwd,
+            stdout=log,
+            stderr=log,
+            env={**os.environ, "PYTHONPATH": str(ROOT)},
+        )
+        _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - started
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(f"tube {' '.join(args)} failed, see {Path(cwd) / 'benchmark.log'}")
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    return elapsed, peak_rss
+
+
+def time_calls(function, arguments, repeat):
+    """Call function(*args) for each argument tuple `repeat` times, with output discarded"""
+    samples = []
+    for _ in range(repeat):
+        for args in arguments:
+            with contextlib.redirect_stdout(io.StringIO()):
+                started = time.perf_counter()
+                function(*args)
+                samples.append(time.perf_counter() - started)
+    return samples
+
+
+def bench_inserts(library, count):
+    """Time writing the same videos row by row (a commit each) and batched (a commit per chunk)"""
+    from tubearchivist_cli.cache.video import VideoTable
+    table = VideoTable()
+    videos = [library.item("video", index) for index in range(count)]
+    results = {}
+    for name, write in [("insert_per_row", lambda: [table.add_video(video) for video in videos]),
+                        ("insert_batched", lambda: table.add_videos(videos))]:
+        table.clear_table()
+        started = time.perf_counter()
+        write()
+        elapsed = time.perf_counter() - started
+        results[name] = {"seconds": elapsed, "rows_per_s": count / elapsed}
+        print(f"  {name}: {count / elapsed:,.0f} rows/s")
+    # Leave an empty cache for the sync benchmarks
+    table.clear_table()
+    speedup = results["insert_per_row"]["seconds"] / results["insert_batched"]["seconds"]
+    results["insert_batched"]["speedup"] = speedup
+    print(f"  batched inserts are {speedup:.1f}x faster over {count:,} videos")
+    return results
+
+
+def bench_sync(library, cwd, concurrency):
+    rows = sum(library.sizes.values())
+    results = {}
+    for name, extra in [("sync_full", []), ("sync_incremental", ["--incremental"])]:
+        elapsed, peak_rss = run_cli(["sync", "all", f"--concurrency={concurrency}", *extra], cwd)
+        results[name] = {
+            "seconds": elapsed,
+            "rows_per_s": rows / elapsed,
+            "peak_rss_mb": peak_rss / 1024 / 1024,
+        }
+        print(f"  {name}: {elapsed:.1f}s, {rows / elapsed:,.0f} rows/s, peak RSS {peak_rss / 1024 / 1024:.0f} MB")
+    return results
+
+
+def bench_search(repeat):
+    from tubearchivist_cli.cli.search import Search
+    search = Search()
+    results = {}
+    for name, method in [("search_videos", search.videos), ("search_all", search.all)]:
+        results[name] = percentiles(time_calls(method, [(query,) for query in SEARCH_QUERIES], repeat))
+        print(f"  {name}: p50 {results[name]['p50_ms']:.1f} ms, p99 {results[name]['p99_ms']:.1f} ms")
+    return results
+
+
+def bench_stats(repeat):
+    from tubearchivist_cli.cli.stats import Stats
+    stats = Stats()
+    results = {}
+    for name in ["overview", "videos", "channels", "playlists"]:
+        results[f"stats_{name}"] = percentiles(time_calls(getattr(stats, name), [()], repeat))
+        print(f"  stats {name}: p50 {results[f'stats_{name}']['p50_ms']:.1f} ms")
+    return results
+
+
+def bench_redownload(server, count, concurrency):
+    from tubearchivist_cli.api.client import TubeArchivistAPI
+    client = TubeArchivistAPI(concurrency=concurrency)
+    video_ids = [f"v{index:010d}" for index in range(count)]
+    queued_before = server.queued
+    started = time.perf_counter()
+    results = client.redownload_videos(video_ids, batch_size=50, concurrency=concurrency)
+    elapsed = time.perf_counter() - started
+    if server.queued - queued_before != count or not all(results.values()):
+        raise RuntimeError("Redownload benchmark lost videos")
+    requests = -(-count // 50)
+    print(f"  redownload: {count / elapsed:,.0f} videos/s, {requests / elapsed:,.1f} requests/s")
+    return {"redownload": {"seconds": elapsed, "videos_per_s": count / elapsed, "requests_per_s": requests / elapsed}}
+
+
+def bench_library(videos, options):
+    from tubearchivist_cli.cache.config import ConfigTable
+    from tubearchivist_cli.cache.connection import close_connections
+
+    library = MockLibrary(videos=videos)
+    server = MockServer(library, latency_ms=options["latency_ms"]).start()
+    print(f"Library {library.sizes}, latency {options['latency_ms']} ms")
+    previous_cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as cwd:
+            # The cache lives in the working directory, for the CLI and the in-process benchmarks alike
+            os.chdir(cwd)
+            try:
+                ConfigTable().set_config(server.url, "benchmark")
+                results = bench_inserts(library, min(videos, options["inserts"]))
+                results.update(bench_sync(library, cwd, options["concurrency"]))
+                results.update(bench_search(options["repeat"]))
+                results.update(bench_stats(options["repeat"]))
+                results.update(bench_redownload(server, min(videos, options["redownload"]), options["concurrency"]))
+                results["database_mb"] = (Path(cwd) / "tubearchive.sqlite").stat().st_size / 1024 / 1024
+            finally:
+                close_connections()
+                os.chdir(previous_cwd)
+    finally:
+        server.stop()
+
+    return {
+        "videos": videos,
+        "sizes": library.sizes,
+        "latency_ms": options["latency_ms"],
+        "concurrency": options["concurrency"],
+        "results": results,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results, prefix=""):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", value
+
+
+def compare(previous, current):
+    """Print every metric next to the same metric from a previous results file"""
+    print(f"\nCompared with {previous.get('revision')} ({previous.get('timestamp')}):")
+    for run in current["runs"]:
+        key = (run["videos"], run["latency_ms"], run["concurrency"])
+        match = next((old for old in previous["runs"]
+                      if (old["videos"], old["latency_ms"], old["concurrency"]) == key), None)
+        if not match:
+            print(f"  no previous run with {run['videos']} videos")
+            continue
+        old_metrics = dict(flatten(match["results"]))
+        print(f"  {run['videos']} videos:")
+        for name, value in flatten(run["results"]):
+            old = old_metrics.get(name)
+            before = f"{old:.6g}" if old is not None else "-"
+            change = f"{(value - old) / old:+.0%}" if old else "n/a"
+            print(f"    {name:<32} {before:>12} -> {value:>12.6g}  {change}")
+
+
+def main():
+    options = {"videos": "10000", "latency_ms": 0.0, "concurrency": 4, "repeat": 20, "redownload": 5000,
+               "inserts": 5000, "output": "benchmark-results.json", "compare": None}
+    for arg in sys.argv[1:]:
+        name, _, value = arg.lstrip("-").partition("=")
+        name = name.replace("-", "_")
+        if name not in options:
+            sys.exit(f"Unknown option: {arg}")
+        default = options[name]
+        options[name] = type(default)(value) if isinstance(default, (int, float)) else value
+
+    runs = [bench_library(int(videos), options) for videos in options["videos"].split(",")]
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "runs": runs,
+    }
+    with open(options["output"], "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"\nResults written to {options['output']}")
+
+    if options["compare"]:
+        with open(options["compare"]) as previous:
+            compare(json.load(previous), report)
+
+
+if __name__ == "__main__":
+    main()
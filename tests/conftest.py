@@ -0,0 +1,70 @@
+"""Fixtures running the API clients against the stand-in server from benchmarks/mock_server.py"""
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.mock_server import MockLibrary, MockServer  # noqa: E402
+
+# The videos table as the first release of the CLI created it
+BASELINE_VIDEOS = """
+CREATE TABLE videos (
+    youtube_id TEXT PRIMARY KEY, title TEXT NOT NULL, description TEXT, published TEXT,
+    date_downloaded INTEGER, active BOOLEAN, vid_last_refresh TEXT, vid_thumb_url TEXT, vid_type TEXT,
+    media_url TEXT, media_size INTEGER, comment_count INTEGER, category TEXT, tags TEXT, channel TEXT,
+    player TEXT, playlist TEXT, sponsorblock TEXT, stats TEXT, streams TEXT, subtitles TEXT,
+    _index TEXT, _score REAL
+)
+"""
+
+
+@pytest.fixture
+def server():
+    # Jitter makes concurrently fetched pages complete out of order
+    server = MockServer(MockLibrary(videos=230, channels=12, playlists=7), latency_ms=2, jitter_ms=20).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """An empty cache in a temporary directory"""
+    from tubearchivist_cli.cache.connection import close_connections
+
+    # The cache lives in the working directory
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path / "tubearchive.sqlite"
+    close_connections()
+
+
+@pytest.fixture
+def configured(server, cache):
+    """A cache in a temporary directory, configured to talk to the stand-in server"""
+    from tubearchivist_cli.cache.config import ConfigTable
+
+    ConfigTable().set_config(server.url, "test-token")
+    return server
+
+
+@pytest.fixture
+def baseline_cache(cache):
+    """A cache holding 30 videos in the baseline schema, with every migration still to run"""
+    import json
+    import sqlite3
+
+    library = MockLibrary(videos=30)
+    connection = sqlite3.connect(cache)
+    connection.execute(BASELINE_VIDEOS)
+    for index in range(30):
+        video = library.item("video", index)
+        connection.execute(
+            "INSERT INTO videos (youtube_id, title, description, tags, channel, streams) VALUES (?, ?, ?, ?, ?, ?)",
+            (video["youtube_id"], video["title"], video["description"], json.dumps(video["tags"]),
+             json.dumps(video["channel"]), json.dumps(video["streams"]))
+        )
+    connection.commit()
+    connection.close()
+    return cache
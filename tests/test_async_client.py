@@ -0,0 +1,90 @@
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from tubearchivist_cli.api.async_client import AsyncTubeArchivistAPI
+from tubearchivist_cli.api.client import TubeArchivistAPI
+
+
+async def collect(pages):
+    return [page async for page in pages]
+
+
+@pytest.mark.parametrize("listing", ["get_all_videos", "get_all_channels", "get_all_playlists"])
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_pages_match_the_sync_client(configured, listing, concurrency):
+    expected = list(getattr(TubeArchivistAPI(concurrency=concurrency, page_size=20), listing)())
+    client = AsyncTubeArchivistAPI(concurrency=concurrency, page_size=20)
+    assert client.run(collect(getattr(client, listing)())) == expected
+
+
+def test_concurrent_pagination_yields_pages_in_order(configured):
+    client = AsyncTubeArchivistAPI(concurrency=4, page_size=20)
+    pages = client.run(collect(client.get_all_videos(start_page=2)))
+    assert [page["paginate"]["current_page"] for page in pages] == list(range(2, 13))
+    assert configured.max_in_flight > 1
+
+
+def test_retries_match_the_sync_client(configured):
+    client = AsyncTubeArchivistAPI()
+    configured.fail(429, retry_after=0)
+    configured.fail(503)
+    data = client.run(client.get_channels(page=1, page_size=5))
+    assert data == TubeArchivistAPI().get_channels(page=1, page_size=5)
+    assert configured.requests["GET /api/channel/"] == 4
+
+
+def test_exhausted_retries_fail_the_listing(configured):
+    client = AsyncTubeArchivistAPI(page_size=5, max_retries=1)
+    configured.fail(503, count=2)
+    with pytest.raises(ConnectionError):
+        client.run(collect(client.get_all_channels()))
+
+
+def test_redownload_matches_the_sync_client(configured):
+    ids = [f"v{index:010d}" for index in range(120)]
+    client = AsyncTubeArchivistAPI()
+    results = client.run(client.redownload_videos(ids, batch_size=50, concurrency=2))
+    async_batches = sorted(configured.batches)
+    configured.batches.clear()
+    assert results == TubeArchivistAPI().redownload_videos(ids, batch_size=50, concurrency=2)
+    assert async_batches == sorted(configured.batches) == [20, 50, 50]
+
+
+def test_redownload_rejects_empty_batches(configured):
+    client = AsyncTubeArchivistAPI()
+    with pytest.raises(ValueError):
+        client.run(client.redownload_videos(["v0000000000"], batch_size=0))
+
+
+def test_health_check_is_shared_with_the_sync_client(configured):
+    client = AsyncTubeArchivistAPI()
+    assert client.run(client.test_connection())
+    assert TubeArchivistAPI().test_connection()
+    assert configured.requests["GET /api/ping/"] == 1
+
+
+
+def cache_contents():
+    from tubearchivist_cli.cache.table import DatabaseTable
+    table = DatabaseTable()
+    return {name: table.execute(f"SELECT * FROM {name} ORDER BY {order}")
+            for name, order in [("videos", "youtube_id"), ("channels", "channel_id"),
+                                ("playlists", "playlist_id"), ("video_streams", "youtube_id, type")]}
+
+
+def test_sync_through_the_event_loop_matches_the_threaded_sync(configured, capsys):
+    from tubearchivist_cli.cli.sync import Sync
+
+    Sync(client=TubeArchivistAPI(page_size=20)).all()
+    threaded = cache_contents()
+    Sync(client=AsyncTubeArchivistAPI(concurrency=4, page_size=20)).all()
+    assert cache_contents() == threaded
+    assert configured.max_in_flight > 1
+
+    configured.library.sizes["video"] += 7
+    capsys.readouterr()
+    Sync(client=AsyncTubeArchivistAPI(concurrency=4, page_size=20), incremental=True).all()
+    assert "Synced videos: 7 new, 0 changed, 0 removed" in capsys.readouterr().out
+    Sync(client=TubeArchivistAPI(page_size=20), incremental=True).all()
+    assert "Synced videos: 0 new, 0 changed, 0 removed" in capsys.readouterr().out
@@ -0,0 +1,179 @@
+import json
+import sqlite3
+
+import pytest
+
+from benchmarks.mock_server import MockLibrary
+from tubearchivist_cli.cache.table import DatabaseTable
+from tubearchivist_cli.cache.video import VideoTable
+
+LIBRARY = MockLibrary(videos=50)
+
+
+def video(index, **fields):
+    return {**LIBRARY.item("video", index), **fields}
+
+
+def assert_derived_tables_match(table):
+    """Check that the search index and video_streams agree with the videos table"""
+    table.execute("INSERT INTO videos_fts(videos_fts) VALUES ('integrity-check')")
+    expected = sum(len(json.loads(streams)) for (streams,) in table.execute("SELECT json(streams) FROM videos"))
+    assert table.execute("SELECT COUNT(*) FROM video_streams") == [(expected,)]
+    assert table.execute("SELECT COUNT(*) FROM video_streams WHERE youtube_id NOT IN (SELECT youtube_id FROM videos)") \
+        == [(0,)]
+
+
+def search_ids(query):
+    from tubearchivist_cli.cli.search import Search
+    return [video_id for video_id, _, _ in Search()._get_video_search_results(query)]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("python", '"python"*'),
+    ("Python tutorial!", '"Python"* "tutorial"*'),
+    ('say "hi" -now', '"say"* "hi"* "now"*'),
+    ("  ", None),
+    ("!?*", None),
+])
+def test_match_expression(query, expected):
+    assert DatabaseTable.match_expression(query) == expected
+
+
+def test_search_matches_prefixes_and_ranks_titles_first(cache):
+    table = VideoTable()
+    table.add_videos([
+        video(0, title="Cooking pasta", description="No snakes here", tags=[]),
+        video(1, title="Snake care", description="Feeding a python", tags=[]),
+        video(2, title="Learning Python", description="Basics", tags=["programming"]),
+    ])
+    assert search_ids("pyth") == ["v0000000002", "v0000000001"]
+    assert search_ids("program") == ["v0000000002"]
+    assert search_ids("learning basics") == ["v0000000002"]
+    assert search_ids("!!") == []
+
+
+def test_search_index_follows_updates_and_deletes(cache):
+    table = VideoTable()
+    table.add_videos([video(0, title="Old title"), video(1, title="Other video")])
+    table.add_video(video(0, title="New title"))
+    table.delete_ids(["v0000000001"])
+    assert search_ids("old") == []
+    assert search_ids("new") == ["v0000000000"]
+    assert search_ids("other") == []
+    assert_derived_tables_match(table)
+
+
+def test_staging_swap_replaces_rows_and_derived_tables(cache):
+    table = VideoTable()
+    table.add_videos(video(index, title=f"Before {index}") for index in range(20))
+
+    table.begin_staging()
+    table.add_videos(video(index, title=f"After {index}") for index in range(10, 40))
+    # Readers keep seeing the live table until the swap
+    assert table.execute("SELECT COUNT(*) FROM videos") == [(20,)]
+    assert len(search_ids("before")) == 20
+    table.swap_staging()
+
+    assert not table.has_staging()
+    assert table.execute("SELECT MIN(youtube_id), MAX(youtube_id), COUNT(*) FROM videos") == \
+        [("v0000000010", "v0000000039", 30)]
+    assert search_ids("before") == []
+    assert len(search_ids("after")) == 30
+    assert_derived_tables_match(table)
+
+    # Triggers and indexes were recreated on the swapped-in tables
+    table.add_video(video(99, title="Later addition"))
+    table.delete_ids(["v0000000010"])
+    assert search_ids("later") == ["v0000000099"]
+    assert_derived_tables_match(table)
+    indexes = {name for (name,) in table.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_videos_channel_id", "idx_video_streams_height"} <= indexes
+
+
+def test_failed_swap_leaves_live_tables_intact(cache, monkeypatch):
+    table = VideoTable()
+    table.add_videos(video(index, title=f"Live {index}") for index in range(20))
+    table.begin_staging()
+    table.add_videos(video(index, title=f"Staged {index}") for index in range(30))
+
+    execute = table.execute
+
+    def failing_execute(query, params=()):
+        # Fails after the videos and videos_fts renames, inside the swap transaction
+        if query.startswith("ALTER TABLE video_streams__staging"):
+            raise sqlite3.OperationalError("disk I/O error")
+        return execute(query, params)
+
+    monkeypatch.setattr(table, "execute", failing_execute)
+    with pytest.raises(sqlite3.OperationalError):
+        table.swap_staging()
+    monkeypatch.undo()
+
+    assert table.execute("SELECT COUNT(*) FROM videos") == [(20,)]
+    assert len(search_ids("live")) == 20
+    assert search_ids("staged") == []
+    assert_derived_tables_match(table)
+    # The staged rows survive for another attempt
+    assert table.has_staging()
+    table.begin_staging(resume=True)
+    table.swap_staging()
+    assert len(search_ids("staged")) == 30
+    assert_derived_tables_match(table)
+
+
+def test_migrations_upgrade_a_baseline_cache(baseline_cache, capsys):
+    # Even a read-only open upgrades the schema
+    table = VideoTable(readonly=True)
+    assert table.execute("SELECT version FROM schema_version WHERE table_name = 'videos'") == \
+        [(table.migrations()[-1][0],)]
+    assert table.execute("SELECT channel_id, channel_name FROM videos WHERE youtube_id = 'v0000000013'") == \
+        [(video(13)["channel"]["channel_id"], video(13)["channel"]["channel_name"])]
+    assert table.execute("SELECT COUNT(*) FROM videos WHERE channel_id IS NULL") == [(0,)]
+    assert search_ids(video(7)["title"])[:1] == ["v0000000007"]
+    assert_derived_tables_match(table)
+    indexes = {name for (name,) in table.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_videos_channel_id", "idx_videos_channel_name", "idx_videos_active",
+            "idx_video_streams_height"} <= indexes
+
+    progress = capsys.readouterr()
+    assert "Upgrading videos cache to schema version 1" in progress.err
+    assert progress.out == ""
+
+    # Upgraded caches open without migrating again
+    VideoTable()
+    assert capsys.readouterr().err == ""
+
+
+def json_columns_round_trip():
+    from tubearchivist_cli.cache.playlist import PlaylistTable
+
+    table = VideoTable()
+    table.add_videos(video(index) for index in range(10))
+    for youtube_id, category, streams, tags in table.execute(
+            "SELECT youtube_id, json(category), json(streams), tags FROM videos ORDER BY youtube_id"):
+        index = int(youtube_id[1:])
+        assert json.loads(category) == video(index)["category"]
+        assert json.loads(streams) == video(index)["streams"]
+        assert json.loads(tags) == video(index)["tags"]
+    assert_derived_tables_match(table)
+
+    playlists = PlaylistTable()
+    playlist = LIBRARY.item("playlist", 3)
+    playlists.add_playlists([playlist])
+    assert playlists.execute("SELECT json(playlist_entries), json_array_length(playlist_entries) FROM playlists") \
+        == [(json.dumps(playlist["playlist_entries"], separators=(",", ":")), len(playlist["playlist_entries"]))]
+    return table, playlists
+
+
+def test_json_columns_round_trip(cache):
+    json_columns_round_trip()
+
+
+@pytest.mark.skipif(sqlite3.sqlite_version_info < (3, 45, 0), reason="JSONB needs SQLite 3.45")
+def test_json_columns_are_stored_as_jsonb(cache):
+    table, playlists = json_columns_round_trip()
+    assert set(table.execute("SELECT typeof(category), typeof(streams), typeof(tags) FROM videos")) == \
+        {("blob", "blob", "text")}
+    assert playlists.execute("SELECT typeof(playlist_entries) FROM playlists") == [("blob",)]
+    assert table.execute("SELECT json_extract(streams, '$[0].height') FROM videos WHERE youtube_id = 'v0000000004'") \
+        == [(video(4)["streams"][0]["height"],)]
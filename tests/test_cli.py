@@ -0,0 +1,231 @@
+import json
+
+import pytest
+
+from benchmarks.mock_server import MockLibrary
+from tubearchivist_cli import cli
+
+
+def run(monkeypatch, capsys, *args):
+    """Run the CLI in-process, returning (exit code, stdout, stderr)"""
+    monkeypatch.setattr(cli, "argv", ["tube.py", *args])
+    try:
+        cli.main()
+        code = 0
+    except SystemExit as e:
+        code = e.code
+    out, err = capsys.readouterr()
+    return code, out, err
+
+
+@pytest.fixture
+def cached_videos(cache):
+    """A cache holding 25 videos, 20 of them titled 'Matching video <n>'"""
+    from tubearchivist_cli.cache.video import VideoTable
+
+    library = MockLibrary(videos=25)
+    VideoTable().add_videos(
+        {**library.item("video", index), "title": f"{'Matching' if index < 20 else 'Other'} video {index}"}
+        for index in range(25)
+    )
+    return cache
+
+
+@pytest.mark.parametrize("option", ["--compression=brotli", "--compression"])
+def test_invalid_compression_exits_before_connecting(configured, monkeypatch, capsys, option):
+    code, _, err = run(monkeypatch, capsys, "sync", "videos", option)
+    assert code == 2
+    assert "--compression" in err
+    assert not configured.requests
+
+
+@pytest.mark.parametrize("option", ["--fields=bogus", "--fields"])
+def test_invalid_field_profile_exits_before_connecting(configured, monkeypatch, capsys, option):
+    code, out, err = run(monkeypatch, capsys, "sync", "all", option)
+    assert code == 2
+    assert "--fields must be one of lean, search, full" in err or "--fields needs a value" in err
+    assert "Invalid" not in out
+    assert not configured.requests
+
+
+@pytest.mark.parametrize("option", ["--limit=0", "--limit=-3", "--limit", "--offset=-1", "--offset=two"])
+def test_invalid_search_pages_exit_2(cached_videos, monkeypatch, capsys, option):
+    code, out, err = run(monkeypatch, capsys, "search", "videos", "matching", option)
+    assert code == 2
+    assert option.split("=")[0] in err
+    assert "Title:" not in out
+
+
+def test_search_limit_shows_a_page_and_points_to_the_next(cached_videos, monkeypatch, capsys):
+    code, out, _ = run(monkeypatch, capsys, "search", "videos", "matching", "--limit=5", "--offset=5")
+    assert code == 0
+    assert out.count("Title: Matching video") == 5
+    assert "Showing 6-10. Use --offset=10 to see more." in out
+    # Limited searches skip the count pass
+    assert "Found" not in out
+
+
+def test_search_limit_on_the_last_page_shows_no_hint(cached_videos, monkeypatch, capsys):
+    code, out, _ = run(monkeypatch, capsys, "search", "videos", "matching", "--limit=5", "--offset=15")
+    assert code == 0
+    assert out.count("Title: Matching video") == 5
+    assert "Showing 16-20 of 20." in out
+
+
+def test_search_count_only_counts_every_match(cached_videos, monkeypatch, capsys):
+    code, out, _ = run(monkeypatch, capsys, "search", "videos", "matching", "--count-only", "--limit=5")
+    assert code == 0
+    assert "Found 20 video(s)." in out
+    assert "Title:" not in out
+
+
+@pytest.mark.parametrize("option", ["--format=xml", "--columns=title,bogus", "--columns", "--since=2024-13-01",
+                                    "--since=yesterday", "--search=!!!", "--output"])
+def test_invalid_export_options_exit_2_before_writing(cached_videos, monkeypatch, capsys, option):
+    code, out, err = run(monkeypatch, capsys, "export", "videos", "--output=dump.jsonl", option)
+    assert code == 2
+    assert option.split("=")[0] in err
+    assert out == ""
+    assert not (cached_videos.parent / "dump.jsonl").exists()
+
+
+def test_export_writes_the_selected_rows(cached_videos, monkeypatch, capsys):
+    code, out, err = run(monkeypatch, capsys, "export", "videos", "--format=csv", "--columns=youtube_id,title",
+                         "--search=matching", "--since=2020-01-01")
+    assert code == 0
+    assert out.splitlines()[0] == "youtube_id,title"
+    assert len(out.splitlines()) == 21
+    assert "Exported 20 videos to stdout" in err
+
+
+def test_export_stdout_holds_only_rows_while_migrating_with_metrics(baseline_cache, monkeypatch, capsys):
+    code, out, err = run(monkeypatch, capsys, "export", "videos", "--columns=youtube_id,channel_id", "--metrics")
+    assert code == 0
+    rows = [json.loads(line) for line in out.splitlines()]
+    assert len(rows) == 30
+    assert all(row["channel_id"] for row in rows)
+    assert "Upgrading videos cache to schema version 1" in err
+    assert "Exported 30 videos to stdout" in err
+    assert '"command": "export videos"' in err
+
+
+def fail_after_page(server, monkeypatch, last_page):
+    """Fail the video page request that follows last_page, returning the unpatched page method"""
+    page = server.library.page
+
+    def failing_page(kind, number, *args, **kwargs):
+        # With --concurrency=1 pages are fetched one at a time, so the next request is the next page
+        if kind == "video" and number == last_page:
+            server.fail(400)
+        return page(kind, number, *args, **kwargs)
+
+    monkeypatch.setattr(server.library, "page", failing_page)
+    return page
+
+
+def test_failed_sync_prints_a_resume_hint_and_resumes(configured, monkeypatch, capsys):
+    from tubearchivist_cli.cache.sync_state import SyncStateTable
+    from tubearchivist_cli.cache.video import VideoTable
+
+    page = fail_after_page(configured, monkeypatch, 2)
+    code, _, err = run(monkeypatch, capsys, "sync", "videos", "--concurrency=1")
+    assert code == 1
+    assert "Failed to fetch videos page 3" in err
+    assert "Videos sync interrupted at page 3; run 'sync videos --resume'" in err
+    state = SyncStateTable().get_state("videos")
+    assert (state["status"], state["last_page"], state["rows"]) == ("running", 2, 100)
+
+    monkeypatch.setattr(configured.library, "page", page)
+    code, out, _ = run(monkeypatch, capsys, "sync", "videos", "--concurrency=1", "--resume")
+    assert code == 0
+    assert "Resuming videos after page 2" in out
+    assert SyncStateTable().get_state("videos")["status"] == "complete"
+    assert VideoTable().execute("SELECT COUNT(*) FROM videos") == [(230,)]
+
+
+@pytest.mark.parametrize("args", [("export", "search"), ("export", "channel"), ("export", "batch_size"),
+                                  ("sync", "resume"), ("sync", "incremental"), ("sync", "client")])
+def test_unknown_actions_exit_2(configured, monkeypatch, capsys, args):
+    code, out, err = run(monkeypatch, capsys, *args)
+    assert code == 2
+    assert f"Unknown {args[0]} action: {args[1]}" in err
+    assert not configured.requests
+
+
+def test_gzipped_stdout_export_names_no_file(cached_videos, monkeypatch):
+    import gzip
+    import io
+    import sys
+    from tubearchivist_cli.cli.export import Export
+
+    class Buffer(io.BytesIO):
+        name = "<stdout>"
+
+    stdout = io.TextIOWrapper(Buffer())
+    monkeypatch.setattr(sys, "stdout", stdout)
+    Export(gzip=True, columns=["youtube_id"]).videos()
+    data = stdout.buffer.getvalue()
+    # No FNAME flag in the gzip header
+    assert not data[3] & 0x08
+    assert len(gzip.decompress(data).splitlines()) == 25
+
+
+def test_export_warns_about_fields_the_sync_left_out(configured, monkeypatch, capsys):
+    run(monkeypatch, capsys, "sync", "videos", "--fields=lean")
+    code, out, err = run(monkeypatch, capsys, "export", "videos", "--columns=youtube_id,description,title")
+    assert code == 0
+    assert "videos were synced without description" in err
+    assert all(json.loads(line)["description"] is None for line in out.splitlines())
+
+    code, _, err = run(monkeypatch, capsys, "export", "videos", "--columns=youtube_id,title")
+    assert "Warning" not in err
+
+
+def test_async_without_aiohttp_names_the_missing_dependency(configured, monkeypatch, capsys):
+    from tubearchivist_cli.api import async_client
+
+    monkeypatch.setattr(async_client, "aiohttp", None)
+    code, out, err = run(monkeypatch, capsys, "sync", "videos", "--async")
+    assert code == 2
+    assert "install it (pip install aiohttp) or drop --async" in err
+    assert "config set" not in out
+
+
+def test_search_channel_needs_a_value(cached_videos, monkeypatch, capsys):
+    code, out, err = run(monkeypatch, capsys, "search", "videos", "matching", "--channel")
+    assert code == 2
+    assert "--channel needs a value" in err
+    assert "Channel filter" not in out
+
+
+def test_interrupted_incremental_sync_suggests_running_it_again(configured, monkeypatch, capsys):
+    run(monkeypatch, capsys, "sync", "videos")
+    # Enough new videos that the first page is all new and paging goes on
+    configured.library.sizes["video"] += 60
+    fail_after_page(configured, monkeypatch, 1)
+    code, _, err = run(monkeypatch, capsys, "sync", "videos", "--incremental", "--concurrency=1")
+    assert code == 1
+    assert "run 'sync videos --incremental' to continue" in err
+    assert "--resume" not in err
+
+    _, out, _ = run(monkeypatch, capsys, "stats", "sync")
+    assert "Interrupted videos sync (incremental) after page 1" in out
+    assert "run 'sync videos --incremental'" in out
+    assert "--resume" not in out
+
+
+def test_resume_with_nothing_to_resume_says_so(configured, monkeypatch, capsys):
+    run(monkeypatch, capsys, "sync", "all")
+    code, out, _ = run(monkeypatch, capsys, "sync", "all", "--resume")
+    assert code == 0
+    assert "No interrupted videos sync to resume." in out
+    assert "Nothing was resumed." in out
+    assert "successfully" not in out
+
+
+@pytest.mark.parametrize("command", ["sync", "redownload"])
+def test_unconfigured_api_points_to_config_set(cache, monkeypatch, capsys, command):
+    code, out, _ = run(monkeypatch, capsys, command, "videos")
+    assert code == 0
+    assert "Configuration error: API not configured" in out
+    assert "Please run 'config set'" in out
@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+from tubearchivist_cli.api.client import TubeArchivistAPI
+
+
+def video_ids(pages):
+    return [video["youtube_id"] for page in pages for video in page["data"]]
+
+
+def test_concurrent_pagination_yields_pages_in_order(configured):
+    client = TubeArchivistAPI(concurrency=4, page_size=20)
+    pages = list(client.get_all_videos())
+    assert [page["paginate"]["current_page"] for page in pages] == list(range(1, 13))
+    assert video_ids(pages) == [f"v{index:010d}" for index in range(230)]
+    assert configured.max_in_flight > 1
+
+
+def test_sequential_pagination_matches_concurrent(configured):
+    pages = list(TubeArchivistAPI(concurrency=1, page_size=20).get_all_videos())
+    assert video_ids(pages) == [f"v{index:010d}" for index in range(230)]
+    assert configured.max_in_flight == 1
+
+
+def test_start_page_skips_earlier_pages(configured):
+    pages = list(TubeArchivistAPI(concurrency=4, page_size=20).get_all_videos(start_page=11))
+    assert video_ids(pages) == [f"v{index:010d}" for index in range(200, 230)]
+
+
+def test_retry_after_is_honored(configured):
+    client = TubeArchivistAPI()
+    configured.fail(429, retry_after=1)
+    started = time.monotonic()
+    data = client.get_channels(page=1, page_size=5)
+    assert time.monotonic() - started >= 1
+    assert len(data["data"]) == 5
+    assert configured.requests["GET /api/channel/"] == 2
+
+
+@pytest.mark.parametrize("status", [500, 502, 503, 504])
+def test_server_errors_are_retried(configured, status):
+    configured.fail(status, count=2)
+    data = TubeArchivistAPI().get_channels(page=1, page_size=5)
+    assert len(data["data"]) == 5
+    assert configured.requests["GET /api/channel/"] == 3
+
+
+def test_client_errors_are_not_retried(configured):
+    configured.fail(400)
+    assert TubeArchivistAPI().get_channels() is None
+    assert configured.requests["GET /api/channel/"] == 1
+
+
+def test_exhausted_retries_fail_the_listing(configured):
+    client = TubeArchivistAPI(concurrency=4, page_size=5, max_retries=1)
+    pages = client.get_all_channels()
+    next(pages)
+    configured.fail(503, count=100)
+    with pytest.raises(ConnectionError):
+        list(pages)
+
+
+def test_redownload_is_sent_in_batches(configured):
+    ids = [f"v{index:010d}" for index in range(120)]
+    results = TubeArchivistAPI().redownload_videos(ids, batch_size=50, concurrency=2)
+    assert results == dict.fromkeys(ids, True)
+    assert sorted(configured.batches) == [20, 50, 50]
+    assert configured.queued == 120
+
+
+def test_redownload_reports_failed_batches(configured):
+    ids = [f"v{index:010d}" for index in range(30)]
+    configured.fail(400)
+    results = TubeArchivistAPI().redownload_videos(ids, batch_size=10)
+    assert list(results.values()) == [False] * 10 + [True] * 20
+
+
+def test_redownload_rejects_empty_batches(configured):
+    with pytest.raises(ValueError):
+        TubeArchivistAPI().redownload_videos(["v0000000000"], batch_size=0)
+
+
+def test_health_check_is_cached(configured):
+    client = TubeArchivistAPI()
+    assert client.test_connection()
+    assert client.test_connection()
+    assert configured.requests["GET /api/ping/"] == 1
+
+
+def test_health_check_falls_back_without_ping(configured):
+    configured.fail(404)
+    assert TubeArchivistAPI().test_connection()
+    assert configured.requests["GET /api/video/"] == 1
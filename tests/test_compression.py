@@ -0,0 +1,66 @@
+import base64
+import json
+import random
+import sqlite3
+
+import pytest
+
+from benchmarks.mock_server import MockLibrary
+from tubearchivist_cli.cache.compression import (CODECS, MIN_SIZE, compress, decompress, get_codec,
+                                                 register_functions)
+from tubearchivist_cli.cache.video import VideoTable
+
+INCOMPRESSIBLE = base64.b64encode(random.Random(0).randbytes(96)).decode()
+TEXT = json.dumps([{"lang": "en", "url": f"https://example.com/subtitles/{index}.vtt"} for index in range(20)])
+
+
+@pytest.fixture
+def connection():
+    connection = sqlite3.connect(":memory:")
+    register_functions(connection)
+    yield connection
+    connection.close()
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_codecs_round_trip_through_sql(connection, name):
+    value = compress(TEXT, get_codec(name))
+    assert isinstance(value, bytes) and len(value) < len(TEXT)
+    assert value[:1] == CODECS[name].tag
+    assert connection.execute("SELECT decompress(?), decompressed_size(?)", (value, value)).fetchone() == \
+        (TEXT, len(TEXT.encode()))
+    assert decompress(value) == TEXT
+
+
+# Too short to bother with, and random enough that zlib's output would be larger
+@pytest.mark.parametrize("text", [None, "x" * (MIN_SIZE - 1), INCOMPRESSIBLE])
+def test_values_that_would_not_shrink_stay_text(connection, text):
+    assert compress(text, get_codec("zlib")) == text
+    assert connection.execute("SELECT decompress(?)", (text,)).fetchone() == (text,)
+
+
+def test_compression_can_be_turned_off():
+    assert get_codec("none") is None
+    assert compress(TEXT, None) == TEXT
+    with pytest.raises(ValueError):
+        get_codec("brotli")
+
+
+def test_tables_read_mixed_compressed_and_plain_rows(cache):
+    library = MockLibrary(videos=30)
+    videos = [library.item("video", index) for index in range(30)]
+    # Rows written before compression existed, then with each codec
+    VideoTable(compression="none").add_videos(videos[:10])
+    VideoTable(compression="zlib").add_videos(videos[10:20])
+    table = VideoTable(compression="lzma")
+    table.add_videos(videos[20:])
+
+    stored = table.execute("SELECT typeof(subtitles), substr(subtitles, 1, 1) FROM videos ORDER BY youtube_id")
+    assert {kind for kind, _ in stored[:10]} == {"text"}
+    assert {tag for kind, tag in stored[10:] if kind == "blob"} == {b"z", b"x"}
+
+    for column in VideoTable.COMPRESSED_COLUMNS:
+        values = table.execute(f"SELECT decompress({column}) FROM videos ORDER BY youtube_id")
+        assert [json.loads(value) for (value,) in values] == [video[column] for video in videos]
+    original, compressed = table.compression_sizes()
+    assert compressed < original
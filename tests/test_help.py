@@ -0,0 +1,44 @@
+import importlib
+import inspect
+import subprocess
+import sys
+
+from tubearchivist_cli.cli.help import Help
+
+
+def imported_commands():
+    """What help would list if it imported every command module, as it did before"""
+    commands = {}
+    for name in Help().cli_path.glob("*.py"):
+        if name.stem in ("__init__", "help"):
+            continue
+        module = importlib.import_module(f"tubearchivist_cli.cli.{name.stem}")
+        cls = getattr(module, name.stem.capitalize(), None)
+        if cls is None or not inspect.getdoc(cls):
+            continue
+        actions = getattr(cls, "ACTIONS", None)
+        methods = [
+            {"name": method, "description": inspect.getdoc(function).split("\n")[0]}
+            for method, function in sorted(vars(cls).items())
+            if inspect.isfunction(function) and not method.startswith("_") and inspect.getdoc(function)
+            and (actions is None or method in actions)
+        ]
+        if methods:
+            commands[name.stem] = {"description": inspect.getdoc(cls).split("\n")[0], "methods": methods}
+    return commands
+
+
+def test_discovered_commands_match_the_modules():
+    commands = Help().commands
+    assert set(commands) == {"config", "export", "redownload", "search", "stats", "sync"}
+    assert commands == imported_commands()
+    assert [method["name"] for method in commands["sync"]["methods"]] == ["all", "channels", "playlists", "videos"]
+
+
+def test_help_imports_no_command_module():
+    code = ("import sys; from tubearchivist_cli.cli.help import Help; Help().show(); "
+            "print(sorted(m for m in sys.modules if m.startswith(('tubearchivist_cli.cli.', 'requests', "
+            "'tubearchivist_cli.cache'))))")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.splitlines()[-1] == "['tubearchivist_cli.cli.help']"
+    assert "sync videos" in output
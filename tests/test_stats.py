@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from tubearchivist_cli.api.client import TubeArchivistAPI
+from tubearchivist_cli.cache.stats import StatsTable
+from tubearchivist_cli.cli.sync import Sync
+
+
+def recompute(table, entity):
+    """Aggregate an entity's statistics in Python, independently of the rollup queries"""
+    if entity == "videos":
+        rows = table.execute("SELECT active, media_size, date_downloaded FROM videos")
+        sizes = [size for _, size, _ in rows if size and size > 0]
+        return {
+            "count": len(rows),
+            "active": sum(active == 1 for active, _, _ in rows),
+            "inactive": sum(active == 0 for active, _, _ in rows),
+            "total_size": sum(sizes) if sizes else None,
+            "avg_size": pytest.approx(sum(sizes) / len(sizes)) if sizes else None,
+            "latest_download": max((date for _, _, date in rows), default=None),
+        }
+    if entity == "channels":
+        rows = table.execute("SELECT channel_subscribed, active FROM channels")
+        return {
+            "count": len(rows),
+            "subscribed": sum(subscribed == 1 for subscribed, _ in rows),
+            "active": sum(active == 1 for _, active in rows),
+        }
+    rows = table.execute("SELECT active, json(playlist_entries) FROM playlists")
+    entries = [json.loads(value) for _, value in rows if value]
+    return {
+        "count": len(rows),
+        "active": sum(active == 1 for active, _ in rows),
+        "total_entries": sum(len(value) for value in entries if isinstance(value, list)),
+        "with_entries": sum(isinstance(value, list) for value in entries),
+    }
+
+
+def assert_rollup_matches(entities=("videos", "channels", "playlists")):
+    table = StatsTable(readonly=True)
+    for entity in entities:
+        stored = table.execute("SELECT metric, value FROM stats_rollup WHERE entity = ?", (entity,))
+        assert dict(stored) == recompute(table, entity)
+
+
+def test_rollup_matches_the_cache_after_syncs_and_deletes(configured):
+    client = TubeArchivistAPI(page_size=20)
+    Sync(client=client).all()
+    assert_rollup_matches()
+
+    # Videos and channels deleted server-side are deleted from the cache by an incremental sync
+    configured.library.sizes["video"] -= 30
+    configured.library.sizes["channel"] -= 2
+    Sync(client=client, incremental=True).all()
+    assert StatsTable().get("videos")["count"] == 200
+    assert_rollup_matches()
+
+    # Deleting every row leaves zero counts and no sizes
+    configured.library.sizes["video"] = 0
+    Sync(client=client, incremental=True).videos()
+    assert_rollup_matches(["videos"])
+    assert StatsTable().get("videos")["total_size"] is None
@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+from tubearchivist_cli.api.client import TubeArchivistAPI
+from tubearchivist_cli.cache.lock import CacheLock, LockedError
+from tubearchivist_cli.cli.sync import Sync
+
+
+def sync_videos(**options):
+    sync = Sync(client=TubeArchivistAPI(concurrency=1, page_size=10), **options)
+    sync.videos()
+    return sync.video_table
+
+
+def cached_ids(table):
+    return {youtube_id for (youtube_id,) in table.execute("SELECT youtube_id FROM videos")}
+
+
+def test_incremental_sync_applies_new_changed_and_removed_videos(configured, capsys):
+    table = sync_videos()
+    assert len(cached_ids(table)) == 230
+
+    configured.library.sizes["video"] = 232
+    table.execute("UPDATE videos SET vid_last_refresh = '0' WHERE youtube_id = 'v0000000229'")
+    table.add_video({**configured.library.item("video", 0), "youtube_id": "gone", "title": "Deleted server-side"})
+    capsys.readouterr()
+
+    table = sync_videos(incremental=True)
+    assert "2 new, 1 changed, 1 removed" in capsys.readouterr().out
+    assert cached_ids(table) == {f"v{index:010d}" for index in range(232)}
+    assert table.execute("SELECT vid_last_refresh FROM videos WHERE youtube_id = 'v0000000229'") == \
+        [(str(configured.library.item("video", 229)["vid_last_refresh"]),)]
+    assert table.execute("SELECT COUNT(*) FROM videos_fts WHERE videos_fts MATCH 'deleted'") == [(0,)]
+
+
+def test_incremental_sync_stops_at_the_first_unchanged_page(configured, capsys):
+    table = sync_videos()
+    configured.library.sizes["video"] = 233
+    # Older than the new videos' page, so an early stop never looks at it again
+    table.execute("UPDATE videos SET vid_last_refresh = '0' WHERE youtube_id = 'v0000000005'")
+    table.commit()
+    requests_before = configured.requests["GET /api/video/"]
+    capsys.readouterr()
+
+    table = sync_videos(incremental=True)
+    assert "3 new, 0 changed, 0 removed" in capsys.readouterr().out
+    assert len(cached_ids(table)) == 233
+    assert table.execute("SELECT vid_last_refresh FROM videos WHERE youtube_id = 'v0000000005'") == [('0',)]
+    # 24 pages in all; only the first few (and what was prefetched) were requested
+    assert configured.requests["GET /api/video/"] - requests_before < 24
+
+
+def test_incremental_sync_without_cutoff_walks_every_page(configured, capsys):
+    table = sync_videos()
+    table.execute("UPDATE videos SET vid_last_refresh = '0' WHERE youtube_id = 'v0000000005'")
+    table.add_video({**configured.library.item("video", 0), "youtube_id": "gone"})
+    capsys.readouterr()
+
+    # With a stale row cached, the server total doesn't match the cache, so no page is skipped
+    table = sync_videos(incremental=True)
+    assert "0 new, 1 changed, 1 removed" in capsys.readouterr().out
+    assert len(cached_ids(table)) == 230
+    assert table.execute("SELECT vid_last_refresh FROM videos WHERE youtube_id = 'v0000000005'") != [('0',)]
+
+
+def test_a_second_sync_is_refused_while_one_is_running(configured):
+    table = sync_videos()
+    # Another process in the middle of a full sync
+    table.begin_staging()
+    with CacheLock(table.database_path):
+        with pytest.raises(LockedError, match=f"process {os.getpid()}"):
+            sync_videos(resume=True)
+        assert table.has_staging()
+    # The lock goes with its holder
+    sync_videos()
+    assert not table.has_staging()
@@ -0,0 +1,250 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from urllib.parse import urljoin, urlsplit
+from typing import AsyncIterator, Awaitable, Dict, List, Optional, TypeVar
+from tubearchivist_cli.api.base import DOWNLOAD_QUEUE_PATH, BaseAPI
+from tubearchivist_cli.api.transport import RETRY_STATUSES, retry_delay
+from tubearchivist_cli import metrics
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class AsyncTokenBucket:
+    """Token bucket allowing `rate` requests per second, shared by every task on the loop"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Take a token, waiting until one is available"""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncTubeArchivistAPI(BaseAPI):
+    """asyncio counterpart of TubeArchivistAPI, fetching pages on one event loop instead of threads
+
+    Coroutines must run through run(), which also closes the HTTP session
+    before the event loop shuts down.
+    """
+
+    def __init__(self, concurrency: int = 16, page_size: int = 50, max_retries: int = 3,
+                 timeout: float = 30, rate_limit: Optional[float] = None):
+        if aiohttp is None:
+            raise ImportError("The async client requires aiohttp (pip install aiohttp)")
+        self.concurrency = max(1, concurrency)
+        self.page_size = page_size
+        self.max_retries = max(0, max_retries)
+        self.timeout = timeout
+        self.rate_limit = rate_limit
+        self._load_config()
+        self.headers['Accept-Encoding'] = 'gzip, deflate'
+        self.session = None
+
+    def run(self, coroutine: Awaitable[T]) -> T:
+        """Run a coroutine on a fresh event loop and close the session afterwards"""
+        async def main():
+            try:
+                return await coroutine
+            finally:
+                await self.close()
+        return asyncio.run(main())
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _get_session(self) -> 'aiohttp.ClientSession':
+        # Sessions and semaphores belong to the running loop, so they are created lazily
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.concurrency, ssl=False)
+            )
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+            self.limiter = AsyncTokenBucket(self.rate_limit, burst=self.concurrency) if self.rate_limit else None
+        return self.session
+
+    async def _request(self, method: str, path: str, limiter: Optional[AsyncTokenBucket] = None,
+                       **kwargs) -> Dict:
+        """Send a request and decode its JSON body, retrying like the synchronous transport
+
+        Raises aiohttp.ClientError once retries are exhausted.
+        """
+        session = self._get_session()
+        url = urljoin(self.base_url, path)
+        endpoint = f"{method} {urlsplit(url).path}"
+        for attempt in range(self.max_retries + 1):
+            for bucket in (self.limiter, limiter):
+                if bucket:
+                    await bucket.acquire()
+            async with self.semaphore:
+                started = time.monotonic()
+                try:
+                    async with session.request(method, url, **kwargs) as response:
+                        body = await response.read()
+                        elapsed = time.monotonic() - started
+                        metrics.observe("http.request", elapsed)
+                        metrics.observe(f"http.request {endpoint}", elapsed)
+                        if response.status >= 400:
+                            metrics.count("http.errors")
+                        metrics.count("http.bytes_received", response.content_length or len(body))
+                        if response.status not in RETRY_STATUSES or attempt == self.max_retries:
+                            response.raise_for_status()
+                            with metrics.phase("api.decode_json"):
+                                # Like response.json(), an empty body decodes to None
+                                return json.loads(body) if body.strip() else None
+                        delay = retry_delay(attempt, response.headers.get('Retry-After'))
+                        logger.warning(f"{endpoint} returned {response.status}, retrying in {delay:.1f}s")
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    metrics.count("http.errors")
+                    if attempt == self.max_retries:
+                        raise
+                    delay = retry_delay(attempt)
+                    logger.warning(f"{endpoint} failed ({e!r}), retrying in {delay:.1f}s")
+            metrics.count("http.retries")
+            await asyncio.sleep(delay)
+
+    async def test_connection(self) -> bool:
+        """Test API connection, trusting a recent successful check for HEALTH_CHECK_TTL seconds"""
+        if self._health_check_is_fresh():
+            return True
+
+        try:
+            try:
+                await self._request('GET', '/api/ping/')
+            except aiohttp.ClientResponseError as e:
+                if e.status != 404:
+                    raise
+                await self._request('GET', '/api/video/', params={'page_size': 1})
+            self._health_check_passed()
+            return True
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Failed to connect to TubeArchivist API: {e!r}")
+            return False
+
+    async def get_videos(self, page: int = 1, page_size: int = 25, **filters) -> Dict:
+        """Get a page of videos from TubeArchivist"""
+        return await self._request('GET', '/api/video/', params={'page': page, 'page_size': page_size, **filters})
+
+    async def get_playlists(self, page: int = 1, page_size: int = 25, **filters) -> Dict:
+        """Get a page of playlists from TubeArchivist"""
+        return await self._request('GET', '/api/playlist/', params={'page': page, 'page_size': page_size, **filters})
+
+    async def get_channels(self, page: int = 1, page_size: int = 25, **filters) -> Dict:
+        """Get a page of channels from TubeArchivist"""
+        return await self._request('GET', '/api/channel/', params={'page': page, 'page_size': page_size, **filters})
+
+    def get_all_videos(self, start_page: int = 1, **filters) -> AsyncIterator[Dict]:
+        """Yield every page of videos from TubeArchivist, optionally skipping the first pages"""
+        return self._iter_pages(self.get_videos, "videos", filters, start_page)
+
+    def get_all_playlists(self, start_page: int = 1, **filters) -> AsyncIterator[Dict]:
+        """Yield every page of playlists from TubeArchivist, optionally skipping the first pages"""
+        return self._iter_pages(self.get_playlists, "playlists", filters, start_page)
+
+    def get_all_channels(self, start_page: int = 1, **filters) -> AsyncIterator[Dict]:
+        """Yield every page of channels from TubeArchivist, optionally skipping the first pages"""
+        return self._iter_pages(self.get_channels, "channels", filters, start_page)
+
+    async def _iter_pages(self, fetch_page, label: str, filters: Dict, start_page: int = 1) -> AsyncIterator[Dict]:
+        """Yield each non-empty page in page order, keeping a bounded number of pages in flight"""
+        data = await self._fetch_page(fetch_page, start_page, label, filters)
+        paginate = data.get('paginate', {})
+        last_page = paginate.get('last_page')
+        total = len(data['data'])
+        if data['data']:
+            yield data
+
+        if not isinstance(last_page, int):
+            # Without a page count, follow next_pages one page at a time
+            page = start_page
+            while data['data'] and data.get('paginate', {}).get('next_pages'):
+                page += 1
+                data = await self._fetch_page(fetch_page, page, label, filters)
+                total += len(data['data'])
+                if data['data']:
+                    yield data
+            logger.info(f"Retrieved {total} total {label}")
+            return
+
+        pages = iter(range(start_page + 1, last_page + 1))
+        pending = deque()
+        try:
+            for page in pages:
+                pending.append(asyncio.ensure_future(self._fetch_page(fetch_page, page, label, filters)))
+                if len(pending) >= self.concurrency * 2:
+                    break
+
+            while pending:
+                data = await pending.popleft()
+                next_page = next(pages, None)
+                if next_page is not None:
+                    pending.append(asyncio.ensure_future(self._fetch_page(fetch_page, next_page, label, filters)))
+                total += len(data['data'])
+                if data['data']:
+                    yield data
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        logger.info(f"Retrieved {total} total {label}")
+
+    async def _fetch_page(self, fetch_page, page: int, label: str, filters: Dict) -> Dict:
+        logger.info(f"Fetching {label} page {page}...")
+        try:
+            data = await fetch_page(page=page, page_size=self.page_size, **filters)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise ConnectionError(f"Failed to fetch {label} page {page}: {e!r}") from e
+        if data and 'data' in data:
+            metrics.count("api.pages_fetched")
+            return data
+        raise ConnectionError(f"Failed to fetch {label} page {page}")
+
+    async def redownload_videos(self, video_ids: List[str], batch_size: int = 50, concurrency: int = 1,
+                                rate_limit: Optional[float] = None) -> Dict[str, bool]:
+        """Queue videos for redownload in batches, returning whether each video was queued"""
+        batches = self._redownload_batches(video_ids, batch_size)
+        limiter = AsyncTokenBucket(rate_limit) if rate_limit else None
+        workers = asyncio.Semaphore(max(1, concurrency))
+
+        async def submit(batch):
+            async with workers:
+                return await self._queue_redownload(batch, limiter)
+
+        outcomes = await asyncio.gather(*(submit(batch) for batch in batches))
+        return self._collect_redownloads(batches, outcomes)
+
+    async def _queue_redownload(self, video_ids: List[str], limiter: Optional[AsyncTokenBucket] = None) -> bool:
+        """Add videos to the download queue with a single request"""
+        try:
+            await self._request('POST', DOWNLOAD_QUEUE_PATH, json=self._redownload_payload(video_ids),
+                                limiter=limiter)
+            logger.info(f"Successfully queued {len(video_ids)} video(s) for redownload")
+            return True
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Failed to queue {len(video_ids)} video(s) for redownload: {e!r}")
+            return False
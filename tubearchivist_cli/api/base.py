@@ -0,0 +1,63 @@
+import logging
+import time
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+# autostart and force requeue videos that were already downloaded
+DOWNLOAD_QUEUE_PATH = '/api/download/?autostart=true&force=true'
+
+
+class ConfigurationError(ValueError):
+    """The API connection hasn't been set up with 'config set'"""
+
+
+class BaseAPI:
+    """Configuration, health-check caching and redownload batching shared by the sync and async clients"""
+
+    # How long a successful health check is trusted before probing again
+    HEALTH_CHECK_TTL = 300
+
+    def _load_config(self):
+        """Read the API URL and key from the cache, raising ConfigurationError when they aren't set"""
+        # Imported here so importing a client doesn't open the cache database
+        from tubearchivist_cli.cache.config import ConfigTable
+        self.config_table = ConfigTable()
+        config = self.config_table.get_config()
+        if not config:
+            raise ConfigurationError("API not configured")
+        self.base_url, self.api_key = config[0]
+        self.headers = {
+            'Authorization': f'Token {self.api_key}',
+            'Content-Type': 'application/json'
+        }
+
+    def _health_check_is_fresh(self) -> bool:
+        last_check = self.config_table.get_last_health_check()
+        if last_check and time.time() - last_check < self.HEALTH_CHECK_TTL:
+            logger.debug("Skipping connection test, last check succeeded recently")
+            return True
+        return False
+
+    def _health_check_passed(self):
+        logger.info("Successfully connected to TubeArchivist API")
+        self.config_table.set_last_health_check(int(time.time()))
+
+    @staticmethod
+    def _redownload_batches(video_ids: List[str], batch_size: int) -> List[List[str]]:
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+        return [video_ids[i:i + batch_size] for i in range(0, len(video_ids), batch_size)]
+
+    @staticmethod
+    def _redownload_payload(video_ids: List[str]) -> Dict:
+        return {"data": [{"youtube_id": video_id, "status": "pending"} for video_id in video_ids]}
+
+    @staticmethod
+    def _collect_redownloads(batches: List[List[str]], outcomes: Iterable[bool]) -> Dict[str, bool]:
+        """Map each video to whether its batch was queued, logging batches as their outcomes arrive"""
+        results = {}
+        for i, (batch, queued) in enumerate(zip(batches, outcomes), 1):
+            results.update(dict.fromkeys(batch, queued))
+            logger.info(f"Batch {i}/{len(batches)}: {'queued' if queued else 'failed'} {len(batch)} videos")
+        return results
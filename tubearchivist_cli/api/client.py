@@ -1,229 +1,206 @@
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from urllib.parse import urljoin
-import urllib3
-from tubearchivist_cli.cli.config import Config
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterator, List, Optional
+from tubearchivist_cli.api.base import DOWNLOAD_QUEUE_PATH, BaseAPI
+from tubearchivist_cli.api.transport import Timeout, TokenBucket, Transport
+from tubearchivist_cli import metrics
 
 logger = logging.getLogger(__name__)
 
-class TubeArchivistAPI:
-    def __init__(self):
-        config = Config()
-        if config.is_configured():
-            config = config.config_table.get_config()
-            self.base_url, self.api_key = config[0]
-            self.headers = {
-                'Authorization': f'Token {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-            self.session = requests.Session()
-            self.session.verify = False
-            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-            self.session.headers.update(self.headers)
-        else:
-            raise ValueError("API not configured")
+class TubeArchivistAPI(BaseAPI):
+    def __init__(self, concurrency: int = 4, page_size: int = 50, max_retries: int = 3,
+                 timeout: Timeout = (5, 30), rate_limit: Optional[float] = None):
+        self.concurrency = max(1, concurrency)
+        self.page_size = page_size
+        self._load_config()
+        self.transport = Transport(
+            self.base_url,
+            self.headers,
+            concurrency=self.concurrency,
+            timeout=timeout,
+            max_retries=max_retries,
+            rate_limit=rate_limit,
+            # Sync.all pages through three listings at once
+            pool_size=self.concurrency * 3
+        )
     
     def test_connection(self) -> bool:
-        """Test API connection"""
+        """Test API connection, trusting a recent successful check for HEALTH_CHECK_TTL seconds"""
+        if self._health_check_is_fresh():
+            return True
+
         try:
-            response = self.session.get(urljoin(self.base_url, '/api/video/'))
-            response.raise_for_status()
-            logger.info("Successfully connected to TubeArchivist API")
+            # The ping endpoint is cheap; older servers without it get a one-item video list
+            try:
+                self.transport.get('/api/ping/', timeout=10)
+            except requests.exceptions.HTTPError as e:
+                if e.response.status_code != 404:
+                    raise
+                self.transport.get('/api/video/', params={'page_size': 1}, timeout=10)
+            self._health_check_passed()
             return True
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to connect to TubeArchivist API: {e}")
             return False
 
-    def get_videos(self, page: int = 1, page_size: int = 25) -> Optional[Dict]:
+    def get_videos(self, page: int = 1, page_size: int = 25, **filters) -> Optional[Dict]:
         """Get videos from TubeArchivist"""
         try:
-            params = {'page': page, 'page_size': page_size}
-            response = self.session.get(
-                urljoin(self.base_url, '/api/video/'),
-                params=params,
-                timeout=30
-            )
-            response.raise_for_status()
-            return response.json()
+            params = {'page': page, 'page_size': page_size, **filters}
+            return self._decode(self.transport.get('/api/video/', params=params))
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to get videos: {e}")
             return None
     
-    def get_all_videos(self) -> List[Dict]:
-        """Get all videos from TubeArchivist"""
-        all_videos = []
-        page = 1
-        
-        while True:
-            logger.info(f"Fetching page {page}...")
-            data = self.get_videos(page=page, page_size=50)
-            
-            if not data or 'data' not in data:
-                logger.warning(f"No data received for page {page}")
-                break
-            
-            videos = data['data']
-            if not videos:
-                logger.info(f"No videos found on page {page}")
-                break
-            
-            all_videos.extend(videos)
-            logger.info(f"Page {page}: Retrieved {len(videos)} videos (total so far: {len(all_videos)})")
-            
-            # Check pagination info
-            paginate = data.get('paginate', {})
-            logger.debug(f"Pagination info: {paginate}")
-            
-            # Check if this is the last page - fixed logic
-            current_page = paginate.get('current_page', page)
-            last_page = paginate.get('last_page')
-            
-            # If current page equals last page number, we're done
-            if isinstance(last_page, int) and current_page >= last_page:
-                logger.info(f"Reached last page ({current_page}/{last_page})")
-                break
-            # Fallback: if no next pages listed, we're done    
-            elif not paginate.get('next_pages'):
-                logger.info("No more pages available")
-                break
-            
-            page += 1
-        
-        logger.info(f"Retrieved {len(all_videos)} total videos")
-        return all_videos
-    
     def redownload_video(self, video_id: str) -> bool:
         """Trigger redownload of a specific video"""
+        return self._queue_redownload([video_id])
+
+    def redownload_videos(self, video_ids: List[str], batch_size: int = 50, concurrency: int = 1,
+                          rate_limit: Optional[float] = None) -> Dict[str, bool]:
+        """Queue videos for redownload in batches, returning whether each video was queued
+
+        rate_limit caps the number of POST requests per second across all workers.
+        """
+        batches = self._redownload_batches(video_ids, batch_size)
+        limiter = TokenBucket(rate_limit) if rate_limit else None
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            outcomes = executor.map(lambda batch: self._queue_redownload(batch, limiter), batches)
+            return self._collect_redownloads(batches, outcomes)
+
+    def _queue_redownload(self, video_ids: List[str], limiter: Optional[TokenBucket] = None) -> bool:
+        """Add videos to the download queue with a single request"""
         try:
-            # Use the correct API format as shown in browser dev tools
-            data = {
-                "data": [
-                    {
-                        "youtube_id": video_id,
-                        "status": "pending"
-                    }
-                ]
-            }
-            response = self.session.post(
-                urljoin(self.base_url, '/api/download/?autostart=true&force=true'),
-                json=data
-            )
-            response.raise_for_status()
-            logger.info(f"Successfully queued video {video_id} for redownload")
+            self.transport.post(DOWNLOAD_QUEUE_PATH, json=self._redownload_payload(video_ids), limiter=limiter)
+            logger.info(f"Successfully queued {len(video_ids)} video(s) for redownload")
             return True
         except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to queue video {video_id} for redownload: {e}")
+            logger.error(f"Failed to queue {len(video_ids)} video(s) for redownload: {e}")
             return False
 
-    def get_playlists(self, page: int = 1, page_size: int = 25) -> Optional[Dict]:
+    def get_playlists(self, page: int = 1, page_size: int = 25, **filters) -> Optional[Dict]:
         """Get playlists from TubeArchivist"""
         try:
-            params = {'page': page, 'page_size': page_size}
-            response = self.session.get(
-                urljoin(self.base_url, '/api/playlist/'),
-                params=params,
-                timeout=30
-            )
-            response.raise_for_status()
-            return response.json()
+            params = {'page': page, 'page_size': page_size, **filters}
+            return self._decode(self.transport.get('/api/playlist/', params=params))
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to get playlists: {e}")
             return None
 
-    def get_all_playlists(self) -> List[Dict]:
-        """Get all playlists from TubeArchivist"""
-        all_playlists = []
-        page = 1
-        
-        while True:
-            logger.info(f"Fetching playlists page {page}...")
-            data = self.get_playlists(page=page, page_size=50)
-            
-            if not data or 'data' not in data:
-                logger.warning(f"No playlist data received for page {page}")
-                break
-            
-            playlists = data['data']
-            if not playlists:
-                logger.info(f"No playlists found on page {page}")
-                break
-            
-            all_playlists.extend(playlists)
-            logger.info(f"Page {page}: Retrieved {len(playlists)} playlists (total so far: {len(all_playlists)})")
-            
-            # Check pagination info
-            paginate = data.get('paginate', {})
-            logger.debug(f"Pagination info: {paginate}")
-            
-            # Check if this is the last page
-            current_page = paginate.get('current_page', page)
-            last_page = paginate.get('last_page')
-            
-            if isinstance(last_page, int) and current_page >= last_page:
-                logger.info(f"Reached last page ({current_page}/{last_page})")
-                break
-            elif not paginate.get('next_pages'):
-                logger.info("No more pages available")
-                break
-            
-            page += 1
-        
-        logger.info(f"Retrieved {len(all_playlists)} total playlists")
-        return all_playlists
-
-    def get_channels(self, page: int = 1, page_size: int = 25) -> Optional[Dict]:
+    def get_channels(self, page: int = 1, page_size: int = 25, **filters) -> Optional[Dict]:
         """Get channels from TubeArchivist"""
         try:
-            params = {'page': page, 'page_size': page_size}
-            response = self.session.get(
-                urljoin(self.base_url, '/api/channel/'),
-                params=params,
-                timeout=30
-            )
-            response.raise_for_status()
-            return response.json()
+            params = {'page': page, 'page_size': page_size, **filters}
+            return self._decode(self.transport.get('/api/channel/', params=params))
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to get channels: {e}")
             return None
 
-    def get_all_channels(self) -> List[Dict]:
-        """Get all channels from TubeArchivist"""
-        all_channels = []
-        page = 1
-        
+    @staticmethod
+    def _decode(response: requests.Response) -> Dict:
+        with metrics.phase("api.decode_json"):
+            return response.json()
+
+    def get_all_videos(self, start_page: int = 1, **filters) -> Iterator[Dict]:
+        """Yield every page of videos from TubeArchivist, optionally skipping the first pages"""
+        return self._iter_pages(self.get_videos, "videos", filters, start_page)
+
+    def get_all_playlists(self, start_page: int = 1, **filters) -> Iterator[Dict]:
+        """Yield every page of playlists from TubeArchivist, optionally skipping the first pages"""
+        return self._iter_pages(self.get_playlists, "playlists", filters, start_page)
+
+    def get_all_channels(self, start_page: int = 1, **filters) -> Iterator[Dict]:
+        """Yield every page of channels from TubeArchivist, optionally skipping the first pages"""
+        return self._iter_pages(self.get_channels, "channels", filters, start_page)
+
+    def _iter_pages(self, fetch_page: Callable[..., Optional[Dict]], label: str,
+                    filters: Dict, start_page: int = 1) -> Iterator[Dict]:
+        """Yield each non-empty page response in page order"""
+        total = 0
+        for page, data in enumerate(self._iter_page_responses(fetch_page, label, filters, start_page), start_page):
+            total += len(data['data'])
+            logger.info(f"Page {page}: Retrieved {len(data['data'])} {label} (total so far: {total})")
+            yield data
+
+        logger.info(f"Retrieved {total} total {label}")
+
+    def _iter_page_responses(self, fetch_page: Callable[..., Optional[Dict]], label: str,
+                             filters: Dict, start_page: int = 1) -> Iterator[Dict]:
+        """Pick a paging strategy based on what the first page reports"""
+        data = self._fetch_page(fetch_page, start_page, label, filters)
+        paginate = data.get('paginate', {})
+        logger.debug(f"Pagination info: {paginate}")
+        last_page = paginate.get('last_page')
+
+        # Once the page count is known the remaining pages can be fetched concurrently
+        if self.concurrency > 1 and isinstance(last_page, int):
+            if data['data']:
+                yield data
+            if last_page > start_page:
+                yield from self._iter_pages_concurrent(fetch_page, label, filters, start_page + 1, last_page)
+        else:
+            yield from self._iter_pages_sequential(fetch_page, label, filters, data, start_page)
+
+    def _iter_pages_sequential(self, fetch_page: Callable[..., Optional[Dict]], label: str,
+                               filters: Dict, data: Dict, page: int = 1) -> Iterator[Dict]:
+        """Walk pages one after another, starting from an already fetched first page"""
         while True:
-            logger.info(f"Fetching channels page {page}...")
-            data = self.get_channels(page=page, page_size=50)
-            
-            if not data or 'data' not in data:
-                logger.warning(f"No channel data received for page {page}")
+            items = data['data']
+            if not items:
+                logger.info(f"No {label} found on page {page}")
                 break
-            
-            channels = data['data']
-            if not channels:
-                logger.info(f"No channels found on page {page}")
-                break
-            
-            all_channels.extend(channels)
-            logger.info(f"Page {page}: Retrieved {len(channels)} channels (total so far: {len(all_channels)})")
-            
-            # Check pagination info
-            paginate = data.get('paginate', {})
-            logger.debug(f"Pagination info: {paginate}")
-            
+
+            yield data
+
             # Check if this is the last page
+            paginate = data.get('paginate', {})
             current_page = paginate.get('current_page', page)
             last_page = paginate.get('last_page')
-            
+
             if isinstance(last_page, int) and current_page >= last_page:
                 logger.info(f"Reached last page ({current_page}/{last_page})")
                 break
+            # Fallback: if no next pages listed, we're done
             elif not paginate.get('next_pages'):
                 logger.info("No more pages available")
                 break
-            
+
             page += 1
-        
-        logger.info(f"Retrieved {len(all_channels)} total channels")
-        return all_channels
+            data = self._fetch_page(fetch_page, page, label, filters)
+
+    def _iter_pages_concurrent(self, fetch_page: Callable[..., Optional[Dict]], label: str,
+                               filters: Dict, first_page: int, last_page: int) -> Iterator[Dict]:
+        """Fetch pages first_page..last_page with a bounded worker pool, yielding them in page order"""
+        logger.info(f"Fetching {last_page - first_page + 1} remaining {label} pages with {self.concurrency} workers")
+        pages = iter(range(first_page, last_page + 1))
+        pending = deque()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        try:
+            # Keep a limited number of pages in flight so memory stays bounded
+            for page in pages:
+                pending.append(executor.submit(self._fetch_page, fetch_page, page, label, filters))
+                if len(pending) >= self.concurrency * 2:
+                    break
+
+            while pending:
+                data = pending.popleft().result()
+                next_page = next(pages, None)
+                if next_page is not None:
+                    pending.append(executor.submit(self._fetch_page, fetch_page, next_page, label, filters))
+                if data['data']:
+                    yield data
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _fetch_page(self, fetch_page: Callable[..., Optional[Dict]], page: int, label: str,
+                    filters: Dict) -> Dict:
+        """Fetch a single page, failing loudly so a sync never ends with a partial cache"""
+        logger.info(f"Fetching {label} page {page}...")
+        data = fetch_page(page=page, page_size=self.page_size, **filters)
+        if data and 'data' in data:
+            metrics.count("api.pages_fetched")
+            return data
+        raise ConnectionError(f"Failed to fetch {label} page {page}")
@@ -0,0 +1,145 @@
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urljoin, urlsplit
+import urllib3
+from typing import Dict, Optional, Tuple, Union
+from tubearchivist_cli import metrics
+
+logger = logging.getLogger(__name__)
+
+Timeout = Union[float, Tuple[float, float]]
+
+# Responses worth retrying: throttling, and gateway or server hiccups
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def retry_delay(attempt: int, retry_after: Optional[str] = None, backoff: float = 0.5,
+                max_backoff: float = 30) -> float:
+    """Honor the server's Retry-After, otherwise back off exponentially with full jitter"""
+    if retry_after:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+            except (TypeError, ValueError):
+                delay = None
+        if delay is not None:
+            return min(max(0, delay), max_backoff)
+    return random.uniform(0, min(max_backoff, backoff * 2 ** attempt))
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` requests per second with bursts of `burst`"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until one is available"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Transport:
+    """HTTP session shared by all API calls, with retries, rate limiting and latency metrics
+
+    Latency, retries and errors are recorded through tubearchivist_cli.metrics,
+    which keeps running aggregates and reports them with --metrics.
+    """
+
+    def __init__(self, base_url: str, headers: Dict[str, str], concurrency: int = 4,
+                 timeout: Timeout = (5, 30), max_retries: int = 3, backoff: float = 0.5,
+                 max_backoff: float = 30, rate_limit: Optional[float] = None,
+                 pool_size: Optional[int] = None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.limiter = TokenBucket(rate_limit, burst=concurrency) if rate_limit else None
+
+        self.session = requests.Session()
+        self.session.verify = False
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        self.session.headers.update(headers)
+        # JSON listings compress well; requests decodes the response transparently
+        self.session.headers['Accept-Encoding'] = 'gzip, deflate'
+        # Size the connection pool so concurrent requests don't discard connections
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size or concurrency))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request('POST', path, **kwargs)
+
+    def request(self, method: str, path: str, limiter: Optional[TokenBucket] = None,
+                **kwargs) -> requests.Response:
+        """Send a request, retrying connection errors and retryable statuses
+
+        Raises requests.exceptions.RequestException once retries are exhausted,
+        including HTTPError for unsuccessful responses.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        url = urljoin(self.base_url, path)
+        endpoint = f"{method} {urlsplit(url).path}"
+
+        for attempt in range(self.max_retries + 1):
+            for bucket in (self.limiter, limiter):
+                if bucket:
+                    bucket.acquire()
+
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self._record(endpoint, time.monotonic() - started, error=True)
+                if attempt == self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt)
+                logger.warning(f"{endpoint} failed ({e}), retrying in {delay:.1f}s")
+            else:
+                failed = response.status_code >= 400
+                # Content-Length is the size on the wire, before gzip is undone
+                metrics.count("http.bytes_received",
+                              int(response.headers.get('Content-Length') or len(response.content)))
+                self._record(endpoint, time.monotonic() - started, error=failed)
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    response.raise_for_status()
+                    return response
+                delay = self._retry_delay(attempt, response)
+                logger.warning(f"{endpoint} returned {response.status_code}, retrying in {delay:.1f}s")
+
+            metrics.count("http.retries")
+            time.sleep(delay)
+
+    def _retry_delay(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        return retry_delay(attempt, retry_after, self.backoff, self.max_backoff)
+
+    def _record(self, endpoint: str, elapsed: float, error: bool = False):
+        logger.debug(f"{endpoint} took {elapsed * 1000:.0f} ms")
+        metrics.observe("http.request", elapsed)
+        metrics.observe(f"http.request {endpoint}", elapsed)
+        if error:
+            metrics.count("http.errors")
@@ -1,12 +1,31 @@
 from tubearchivist_cli.cache.table import DatabaseTable
+from tubearchivist_cli.cache.migrations import create_indexes
 import json
 
 
 class ChannelTable(DatabaseTable):
-    def __init__(self):
-        super().__init__()
+    ID_COLUMN = "channel_id"
+    REFRESH_COLUMN = "channel_last_refresh"
+    SEARCH_COLUMNS = ("channel_name", "channel_description")
+    FIELD_PROFILES = {
+        "lean": ("channel_banner_url", "channel_thumb_url", "channel_overwrites", "channel_description"),
+        "search": ("channel_banner_url", "channel_thumb_url", "channel_overwrites"),
+        "full": (),
+    }
+    JSON_COLUMNS = ("channel_overwrites",)
+
+    INSERT_QUERY = """
+    INSERT OR REPLACE INTO {table} (
+        channel_id, channel_name, channel_banner_url, channel_thumb_url, 
+        channel_description, channel_last_refresh, channel_subscribed, 
+        channel_overwrites, date_downloaded, active, _index, _score
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    def __init__(self, readonly=False):
+        super().__init__(readonly=readonly)
         self.database_name = "channels"
-        self.create_table()
+        self.open_table()
 
     def create_table(self):
         query = f"""
@@ -28,30 +47,40 @@ class ChannelTable(DatabaseTable):
         self.execute(query)
         self.commit()
 
+    def migrations(self):
+        return [
+            (1, "build full-text search index", self.create_search_index),
+            (2, "index filter columns", self._migrate_filter_indexes),
+        ]
+
+    def _migrate_filter_indexes(self):
+        create_indexes(self, {
+            "active": "active",
+            "channel_subscribed": "channel_subscribed",
+        })
+
     def add_channel(self, channel_data):
-        query = """
-        INSERT OR REPLACE INTO channels (
-            channel_id, channel_name, channel_banner_url, channel_thumb_url, 
-            channel_description, channel_last_refresh, channel_subscribed, 
-            channel_overwrites, date_downloaded, active, _index, _score
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
+        self.execute(self.insert_query(), self._channel_values(channel_data))
+        self.commit()
+
+    def add_channels(self, channels, chunk_size=1000):
+        """Insert channels in chunked transactions, returning the number written"""
+        query = self.insert_query()
+        return self.insert_many(query, map(self._channel_values, channels), chunk_size)
 
-        # Extract and prepare data
-        values = (
+    def _channel_values(self, channel_data):
+        skipped = self.skipped_fields
+        return (
             channel_data.get('channel_id'),
             channel_data.get('channel_name'),
-            channel_data.get('channel_banner_url'),
-            channel_data.get('channel_thumb_url'),
-            channel_data.get('channel_description'),
+            None if 'channel_banner_url' in skipped else channel_data.get('channel_banner_url'),
+            None if 'channel_thumb_url' in skipped else channel_data.get('channel_thumb_url'),
+            None if 'channel_description' in skipped else channel_data.get('channel_description'),
             channel_data.get('channel_last_refresh'),
             channel_data.get('channel_subscribed'),
-            json.dumps(channel_data.get('channel_overwrites', {})),
+            None if 'channel_overwrites' in skipped else json.dumps(channel_data.get('channel_overwrites', {})),
             channel_data.get('date_downloaded'),
             channel_data.get('active'),
             channel_data.get('_index'),
             channel_data.get('_score')
         )
-
-        self.execute(query, values)
-        self.commit()
@@ -0,0 +1,115 @@
+"""Compression for cold columns: JSON payloads the cache stores but rarely reads
+
+A compressed value is a BLOB holding a one-byte codec tag, the uncompressed size
+as a 4-byte big-endian integer, then the codec's output. Values that wouldn't
+shrink stay plain TEXT, as does everything in caches written before compression
+existed, so readers handle both. SQL reads go through the decompress() and
+decompressed_size() functions registered on every connection.
+"""
+import struct
+import zlib
+
+HEADER = struct.Struct(">cI")
+DEFAULT_CODEC = "zlib"
+# Shorter values rarely shrink, and each compress() call has a fixed setup cost of ~15 µs
+MIN_SIZE = 128
+
+
+class Codec:
+    """A compression algorithm; subclasses set a unique `name` and one-byte `tag`"""
+    name = None
+    tag = None
+
+    def compress(self, data):
+        raise NotImplementedError
+
+    def decompress(self, data):
+        raise NotImplementedError
+
+
+class ZlibCodec(Codec):
+    name = "zlib"
+    tag = b"z"
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def compress(self, data):
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+class LzmaCodec(Codec):
+    """Smaller than zlib on large payloads, several times slower to write"""
+    name = "lzma"
+    tag = b"x"
+    FILTERS = [{"id": 0x21, "preset": 6}]  # LZMA2 in a raw stream, without the .xz container overhead
+
+    def compress(self, data):
+        import lzma
+        return lzma.compress(data, format=lzma.FORMAT_RAW, filters=self.FILTERS)
+
+    def decompress(self, data):
+        import lzma
+        return lzma.decompress(data, format=lzma.FORMAT_RAW, filters=self.FILTERS)
+
+
+CODECS = {}
+_codecs_by_tag = {}
+
+
+def register_codec(codec):
+    """Make a codec available to `sync --compression=<name>` and to readers"""
+    if codec.tag in _codecs_by_tag and _codecs_by_tag[codec.tag].name != codec.name:
+        raise ValueError(f"Codec tag {codec.tag!r} is already used by {_codecs_by_tag[codec.tag].name}")
+    CODECS[codec.name] = codec
+    _codecs_by_tag[codec.tag] = codec
+
+
+register_codec(ZlibCodec())
+register_codec(LzmaCodec())
+
+
+def get_codec(name=None):
+    """Look up a codec by name; "none" turns compression off and returns None"""
+    name = name or DEFAULT_CODEC
+    if name == "none":
+        return None
+    if name not in CODECS:
+        raise ValueError(f"Unknown compression codec: {name} (available: {', '.join([*CODECS, 'none'])})")
+    return CODECS[name]
+
+
+def compress(text, codec):
+    """Encode a column value, keeping it as text when compression doesn't pay off"""
+    if codec is None or text is None or len(text) < MIN_SIZE:
+        return text
+    data = text.encode()
+    compressed = codec.compress(data)
+    if len(compressed) + HEADER.size >= len(data):
+        return text
+    return HEADER.pack(codec.tag, len(data)) + compressed
+
+
+def decompress(value):
+    """Return a column value as text, whether it was stored compressed or not"""
+    if not isinstance(value, bytes):
+        return value
+    tag, _ = HEADER.unpack_from(value)
+    return _codecs_by_tag[tag].decompress(value[HEADER.size:]).decode()
+
+
+def decompressed_size(value):
+    """Size in bytes of a column value once decompressed, read from the header without decompressing"""
+    if value is None:
+        return 0
+    if isinstance(value, bytes):
+        return HEADER.unpack_from(value)[1]
+    return len(str(value).encode())
+
+
+def register_functions(connection):
+    connection.create_function("decompress", 1, decompress, deterministic=True)
+    connection.create_function("decompressed_size", 1, decompressed_size, deterministic=True)
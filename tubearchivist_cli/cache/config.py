@@ -2,20 +2,29 @@ from tubearchivist_cli.cache.table import DatabaseTable
 
 
 class ConfigTable(DatabaseTable):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, readonly=False):
+        super().__init__(readonly=readonly)
         self.database_name = "config"
-        self.create_table()
+        self.open_table()
 
     def create_table(self):
         self.execute(f"""
         CREATE TABLE IF NOT EXISTS {self.database_name} (
             tubearchivist_url TEXT PRIMARY KEY,
-            api_key TEXT NOT NULL
+            api_key TEXT NOT NULL,
+            last_health_check INTEGER
         )
         """)
         self.commit()
 
+    def migrations(self):
+        return [
+            (1, "remember the last successful API health check", self._migrate_health_check),
+        ]
+
+    def _migrate_health_check(self):
+        self.add_column("last_health_check", "INTEGER")
+
     def set_config(self, tubearchivist_url, api_key):
         # Always keep only one row in the config table
         self.clear_table()
@@ -25,3 +34,11 @@ class ConfigTable(DatabaseTable):
 
     def get_config(self):
         return self.execute(f"SELECT tubearchivist_url, api_key FROM {self.database_name}")
+
+    def get_last_health_check(self):
+        result = self.execute(f"SELECT last_health_check FROM {self.database_name}")
+        return result[0][0] if result else None
+
+    def set_last_health_check(self, timestamp):
+        self.execute(f"UPDATE {self.database_name} SET last_health_check = ?", (timestamp,))
+        self.commit()
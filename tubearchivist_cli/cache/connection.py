@@ -0,0 +1,52 @@
+from tubearchivist_cli.cache.compression import register_functions
+import sqlite3
+import threading
+
+
+# Connections are shared by every table in a thread; SQLite connections can't cross threads
+_local = threading.local()
+
+# SQLite 3.45 added JSONB, a binary JSON encoding its json functions read without reparsing
+JSONB = sqlite3.sqlite_version_info >= (3, 45, 0)
+
+PRAGMAS = {
+    "busy_timeout": 5000,
+    "synchronous": "NORMAL",
+    "cache_size": -65536,
+    "mmap_size": 268435456,
+    # INSERT OR REPLACE must fire delete triggers so derived tables and search indexes stay in sync
+    "recursive_triggers": "ON",
+}
+
+
+def get_connection(database_path="tubearchive.sqlite", readonly=False):
+    """Return the shared connection for a database file, opening it on first use
+
+    Writable connections switch the database to WAL so readers never block the
+    sync writer (and vice versa). Read-only connections fall back to a writable
+    one when the database file doesn't exist yet.
+    """
+    connections = _local.__dict__.setdefault("connections", {})
+    key = (database_path, readonly)
+    if key not in connections:
+        if readonly:
+            try:
+                connection = sqlite3.connect(f"file:{database_path}?mode=ro", uri=True)
+            except sqlite3.OperationalError:
+                return get_connection(database_path)
+        else:
+            connection = sqlite3.connect(database_path)
+        for name, value in PRAGMAS.items():
+            connection.execute(f"PRAGMA {name} = {value}")
+        register_functions(connection)
+        if not readonly:
+            connection.execute("PRAGMA journal_mode = WAL")
+        connections[key] = connection
+    return connections[key]
+
+
+def close_connections(database_path="tubearchive.sqlite"):
+    """Close this thread's connections to a database file"""
+    connections = _local.__dict__.get("connections", {})
+    for key in [key for key in connections if key[0] == database_path]:
+        connections.pop(key).close()
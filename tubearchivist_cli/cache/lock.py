@@ -0,0 +1,64 @@
+"""Advisory locks that keep two processes from running the same cache operation at once
+
+A lock is held on "<database>.<name>.lock" for as long as its file stays open.
+The operating system releases it when the holder exits, however it exits, so an
+interrupted or crashed sync never leaves a stale lock behind.
+"""
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class LockedError(Exception):
+    """Another process holds the lock"""
+
+
+class CacheLock:
+    def __init__(self, database_path="tubearchive.sqlite", name="sync"):
+        self.path = f"{database_path}.{name}.lock"
+        self.file = None
+
+    def acquire(self):
+        """Take the lock without waiting, raising LockedError if another process has it"""
+        file = open(self.path, "a+")
+        try:
+            if fcntl:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            owner = self._owner(file)
+            file.close()
+            raise LockedError(f"held by process {owner}" if owner else "held by another process") from None
+        # Record the holder, so whoever is refused can tell which process to wait for
+        file.seek(0)
+        file.truncate()
+        file.write(str(os.getpid()))
+        file.flush()
+        self.file = file
+        return self
+
+    def release(self):
+        if self.file:
+            # Closing the file releases the lock
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    @staticmethod
+    def _owner(file):
+        try:
+            file.seek(0)
+            return file.read().strip()
+        except OSError:
+            return None
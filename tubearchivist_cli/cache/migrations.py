@@ -0,0 +1,85 @@
+import sys
+import time
+
+
+def get_schema_version(table):
+    """Get the schema version recorded for a table, or 0 if it was never migrated"""
+    exists = table.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'")
+    if not exists:
+        return 0
+    result = table.execute("SELECT version FROM schema_version WHERE table_name = ?", (table.database_name,))
+    return result[0][0] if result else 0
+
+
+def is_current(table):
+    """Check whether every migration of a table has been applied"""
+    migrations = table.migrations()
+    return not migrations or get_schema_version(table) >= migrations[-1][0]
+
+
+def run_migrations(table):
+    """Apply a table's pending migrations in order, recording each version as it completes
+
+    Progress goes to stderr, so commands whose stdout carries data (export) stay clean.
+    """
+    table.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        table_name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL,
+        updated_at INTEGER NOT NULL
+    )
+    """)
+    current = get_schema_version(table)
+    # Upgrades of an empty table are instant, so only report progress for existing caches
+    verbose = has_rows(table)
+
+    for version, description, migrate in table.migrations():
+        if version <= current:
+            continue
+        if verbose:
+            print(f"Upgrading {table.database_name} cache to schema version {version}: {description}...",
+                  file=sys.stderr)
+        started = time.monotonic()
+        migrate()
+        table.execute(
+            "INSERT OR REPLACE INTO schema_version (table_name, version, updated_at) VALUES (?, ?, ?)",
+            (table.database_name, version, int(time.time()))
+        )
+        table.commit()
+        if verbose:
+            print(f"  Done in {time.monotonic() - started:.1f}s", file=sys.stderr)
+
+
+def has_rows(table):
+    return bool(table.execute(f"SELECT 1 FROM {table.database_name} LIMIT 1"))
+
+
+def create_indexes(table, indexes):
+    """Build (column list) indexes on a table, skipping any that already exist"""
+    for name, columns in indexes.items():
+        index_name = f"idx_{table.database_name}_{name}"
+        exists = table.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (index_name,))
+        if exists:
+            continue
+        if has_rows(table):
+            print(f"  Building index {index_name}...", file=sys.stderr)
+        table.execute(f"CREATE INDEX {index_name} ON {table.database_name} ({columns})")
+        table.commit()
+
+
+def backfill(table, statement, batch_size=5000):
+    """Run a statement over rowid ranges, committing and reporting progress after each batch
+
+    The statement must restrict itself to `rowid BETWEEN ? AND ?`.
+    """
+    result = table.execute(f"SELECT MIN(rowid), MAX(rowid), COUNT(*) FROM {table.database_name}")
+    first, last, total = result[0]
+    if not total:
+        return
+
+    for start in range(first, last + 1, batch_size):
+        end = min(start + batch_size - 1, last)
+        table.execute(statement, (start, end))
+        table.commit()
+        print(f"  Backfilled {(end - first + 1) / (last - first + 1):.0%} of {total:,} {table.database_name} rows",
+              file=sys.stderr)
@@ -1,12 +1,33 @@
 from tubearchivist_cli.cache.table import DatabaseTable
+from tubearchivist_cli.cache.migrations import create_indexes
 import json
 
 
 class PlaylistTable(DatabaseTable):
-    def __init__(self):
-        super().__init__()
+    ID_COLUMN = "playlist_id"
+    REFRESH_COLUMN = "playlist_last_refresh"
+    SEARCH_COLUMNS = ("playlist_name", "playlist_description")
+    # Entries are kept by every profile: stats and search count them
+    FIELD_PROFILES = {
+        "lean": ("playlist_thumbnail", "playlist_description"),
+        "search": ("playlist_thumbnail",),
+        "full": (),
+    }
+    JSON_COLUMNS = ("playlist_entries",)
+
+    # playlist_entries is only read by SQL, so it is stored as JSONB where available
+    INSERT_QUERY = """
+    INSERT OR REPLACE INTO {table} (
+        playlist_id, playlist_name, playlist_description, playlist_channel, 
+        playlist_channel_id, playlist_thumbnail, playlist_last_refresh, 
+        playlist_entries, date_downloaded, active, _index, _score
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, {json}, ?, ?, ?, ?)
+    """
+
+    def __init__(self, readonly=False):
+        super().__init__(readonly=readonly)
         self.database_name = "playlists"
-        self.create_table()
+        self.open_table()
 
     def create_table(self):
         query = f"""
@@ -28,23 +49,36 @@ class PlaylistTable(DatabaseTable):
         self.execute(query)
         self.commit()
 
+    def migrations(self):
+        return [
+            (1, "build full-text search index", self.create_search_index),
+            (2, "index filter columns", self._migrate_filter_indexes),
+        ]
+
+    def _migrate_filter_indexes(self):
+        create_indexes(self, {
+            "active": "active",
+            "date_downloaded": "date_downloaded",
+        })
+
     def add_playlist(self, playlist_data):
-        query = """
-        INSERT OR REPLACE INTO playlists (
-            playlist_id, playlist_name, playlist_description, playlist_channel, 
-            playlist_channel_id, playlist_thumbnail, playlist_last_refresh, 
-            playlist_entries, date_downloaded, active, _index, _score
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
+        self.execute(self.insert_query(), self._playlist_values(playlist_data))
+        self.commit()
+
+    def add_playlists(self, playlists, chunk_size=1000):
+        """Insert playlists in chunked transactions, returning the number written"""
+        query = self.insert_query()
+        return self.insert_many(query, map(self._playlist_values, playlists), chunk_size)
 
-        # Extract and prepare data
-        values = (
+    def _playlist_values(self, playlist_data):
+        skipped = self.skipped_fields
+        return (
             playlist_data.get('playlist_id'),
             playlist_data.get('playlist_name'),
-            playlist_data.get('playlist_description'),
+            None if 'playlist_description' in skipped else playlist_data.get('playlist_description'),
             playlist_data.get('playlist_channel'),
             playlist_data.get('playlist_channel_id'),
-            playlist_data.get('playlist_thumbnail'),
+            None if 'playlist_thumbnail' in skipped else playlist_data.get('playlist_thumbnail'),
             playlist_data.get('playlist_last_refresh'),
             json.dumps(playlist_data.get('playlist_entries', [])),
             playlist_data.get('date_downloaded'),
@@ -52,6 +86,3 @@ class PlaylistTable(DatabaseTable):
             playlist_data.get('_index'),
             playlist_data.get('_score')
         )
-
-        self.execute(query, values)
-        self.commit()
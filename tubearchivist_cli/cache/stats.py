@@ -0,0 +1,72 @@
+from tubearchivist_cli.cache.table import DatabaseTable
+import time
+
+
+class StatsTable(DatabaseTable):
+    # One aggregate pass per cached entity; every result column is stored as a metric
+    ROLLUP_QUERIES = {
+        "videos": """
+        SELECT COUNT(*) AS count,
+               COALESCE(SUM(active = 1), 0) AS active,
+               COALESCE(SUM(active = 0), 0) AS inactive,
+               SUM(CASE WHEN media_size > 0 THEN media_size END) AS total_size,
+               AVG(CASE WHEN media_size > 0 THEN media_size END) AS avg_size,
+               MAX(date_downloaded) AS latest_download
+        FROM videos
+        """,
+        "channels": """
+        SELECT COUNT(*) AS count,
+               COALESCE(SUM(channel_subscribed = 1), 0) AS subscribed,
+               COALESCE(SUM(active = 1), 0) AS active
+        FROM channels
+        """,
+        "playlists": """
+        SELECT COUNT(*) AS count,
+               COALESCE(SUM(active = 1), 0) AS active,
+               COALESCE(SUM(CASE WHEN json_type(playlist_entries) = 'array'
+                                 THEN json_array_length(playlist_entries) END), 0) AS total_entries,
+               COUNT(CASE WHEN json_type(playlist_entries) = 'array' THEN 1 END) AS with_entries
+        FROM playlists
+        """,
+    }
+
+    def __init__(self, readonly=False):
+        super().__init__(readonly=readonly)
+        self.database_name = "stats_rollup"
+        self.open_table()
+
+    def create_table(self):
+        self.execute(f"""
+        CREATE TABLE IF NOT EXISTS {self.database_name} (
+            entity TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            value NUMERIC,
+            refreshed_at INTEGER NOT NULL,
+            PRIMARY KEY (entity, metric)
+        )
+        """)
+        self.commit()
+
+    def compute(self, entity):
+        """Aggregate an entity's statistics from its cache table in a single pass"""
+        row = self.execute(self.ROLLUP_QUERIES[entity])[0]
+        return {column[0]: value for column, value in zip(self.cursor.description, row)}
+
+    def refresh(self, entity):
+        """Recompute and store an entity's statistics, typically at the end of a sync"""
+        metrics = self.compute(entity)
+        refreshed_at = int(time.time())
+        self.execute(f"DELETE FROM {self.database_name} WHERE entity = ?", (entity,))
+        self.executemany(
+            f"INSERT INTO {self.database_name} (entity, metric, value, refreshed_at) VALUES (?, ?, ?, ?)",
+            [(entity, metric, value, refreshed_at) for metric, value in metrics.items()]
+        )
+        self.commit()
+        return metrics
+
+    def get(self, entity):
+        """Get an entity's stored statistics, aggregating live if it was never rolled up"""
+        rows = self.execute(f"SELECT metric, value FROM {self.database_name} WHERE entity = ?", (entity,))
+        if not rows:
+            return self.compute(entity)
+        return dict(rows)
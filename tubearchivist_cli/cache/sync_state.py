@@ -0,0 +1,116 @@
+from tubearchivist_cli.cache.table import DatabaseTable
+import time
+
+
+class SyncStateTable(DatabaseTable):
+    """Checkpoints of in-progress syncs, plus a history of finished runs in sync_runs"""
+
+    def __init__(self, readonly=False):
+        super().__init__(readonly=readonly)
+        self.database_name = "sync_state"
+        self.open_table()
+
+    def create_table(self):
+        self.execute(f"""
+        CREATE TABLE IF NOT EXISTS {self.database_name} (
+            entity TEXT PRIMARY KEY,
+            mode TEXT NOT NULL,
+            status TEXT NOT NULL,
+            last_page INTEGER NOT NULL DEFAULT 0,
+            page_size INTEGER,
+            server_total INTEGER,
+            rows INTEGER NOT NULL DEFAULT 0,
+            started_at INTEGER NOT NULL,
+            elapsed REAL NOT NULL DEFAULT 0
+        )
+        """)
+        self.execute("""
+        CREATE TABLE IF NOT EXISTS sync_runs (
+            id INTEGER PRIMARY KEY,
+            entity TEXT NOT NULL,
+            mode TEXT NOT NULL,
+            started_at INTEGER NOT NULL,
+            finished_at INTEGER NOT NULL,
+            duration REAL NOT NULL,
+            rows INTEGER NOT NULL,
+            server_total INTEGER
+        )
+        """)
+        self.commit()
+
+    def migrations(self):
+        return [
+            (1, "record the field profile of each sync", self._migrate_fields),
+        ]
+
+    def _migrate_fields(self):
+        self.add_column("fields", "TEXT")
+        self.add_column("fields", "TEXT", table="sync_runs")
+
+    def get_state(self, entity):
+        """Get an entity's checkpoint as a dict, or None if it was never synced"""
+        rows = self.execute(f"SELECT * FROM {self.database_name} WHERE entity = ?", (entity,))
+        if not rows:
+            return None
+        return {column[0]: value for column, value in zip(self.cursor.description, rows[0])}
+
+    def start(self, entity, mode, page_size, fields="full"):
+        self.execute(
+            f"INSERT OR REPLACE INTO {self.database_name} (entity, mode, status, page_size, started_at, fields) "
+            "VALUES (?, ?, 'running', ?, ?, ?)",
+            (entity, mode, page_size, int(time.time()), fields)
+        )
+        self.commit()
+
+    def resume(self, entity):
+        self.execute(f"UPDATE {self.database_name} SET mode = 'resumed' WHERE entity = ?", (entity,))
+        self.commit()
+
+    @staticmethod
+    def continue_command(state):
+        """The command that picks up an unfinished sync: full syncs resume, incremental ones just run again"""
+        if state['mode'] == 'incremental':
+            return f"sync {state['entity']} --incremental"
+        return f"sync {state['entity']} --resume"
+
+    def checkpoint(self, entity, page, server_total, rows, elapsed):
+        """Record that every page up to and including `page` has been committed"""
+        self.execute(
+            f"UPDATE {self.database_name} SET last_page = ?, server_total = ?, rows = ?, elapsed = ? "
+            "WHERE entity = ?",
+            (page, server_total, rows, elapsed, entity)
+        )
+        self.commit()
+
+    def finish(self, entity, rows, elapsed):
+        """Mark an entity's sync as complete and add it to the run history"""
+        self.execute(
+            f"UPDATE {self.database_name} SET status = 'complete', rows = ?, elapsed = ? WHERE entity = ?",
+            (rows, elapsed, entity)
+        )
+        self.execute(f"""
+        INSERT INTO sync_runs (entity, mode, started_at, finished_at, duration, rows, server_total, fields)
+        SELECT entity, mode, started_at, ?, elapsed, rows, server_total, fields
+        FROM {self.database_name} WHERE entity = ?
+        """, (int(time.time()), entity))
+        self.commit()
+
+    def get_runs(self, limit=10):
+        return self.execute(
+            "SELECT entity, mode, finished_at, duration, rows, server_total FROM sync_runs "
+            "ORDER BY id DESC LIMIT ?",
+            (limit,)
+        )
+
+    def get_fields(self, entity):
+        """Get the field profile of the cached rows: that of the last finished sync"""
+        result = self.execute(
+            "SELECT fields FROM sync_runs WHERE entity = ? ORDER BY id DESC LIMIT 1", (entity,)
+        )
+        # Caches synced before profiles existed stored every field
+        return result[0][0] if result and result[0][0] else "full"
+
+    def missing_fields(self, table, columns):
+        """List which of `columns` the cached rows of `table` don't have, given its field profile"""
+        skipped = table.FIELD_PROFILES.get(self.get_fields(table.database_name), ())
+        return [column for column in columns if column in skipped]
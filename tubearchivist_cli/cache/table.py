@@ -1,15 +1,284 @@
+from tubearchivist_cli.cache.compression import compress, get_codec
+from tubearchivist_cli.cache.connection import JSONB, close_connections, get_connection
+from tubearchivist_cli.cache.migrations import is_current, run_migrations
+from tubearchivist_cli import metrics
+from itertools import islice
+import re
 import sqlite3
 
 
 class DatabaseTable:
-    def __init__(self, database_path="tubearchive.sqlite"):
+    # Primary key and refresh-timestamp columns, set by tables that support incremental sync
+    ID_COLUMN = None
+    REFRESH_COLUMN = None
+    # Text columns covered by the table's FTS5 search index
+    SEARCH_COLUMNS = ()
+    # Full syncs write into "<table>__staging" and swap it in once complete
+    STAGING_SUFFIX = "__staging"
+    # Rarely read JSON columns, stored through self.codec; SQL reads them with decompress(column)
+    COMPRESSED_COLUMNS = ()
+    # Columns each `sync --fields` profile leaves NULL; "full" stores everything
+    FIELD_PROFILES = {"full": ()}
+    # Columns holding JSON, whether as text, JSONB or compressed
+    JSON_COLUMNS = ()
+
+    def __init__(self, database_path="tubearchive.sqlite", readonly=False, compression=None):
         self.database_path = database_path
-        self.connection = sqlite3.connect(self.database_path)
+        self.readonly = readonly
+        self.connection = get_connection(self.database_path, readonly)
         self.cursor = self.connection.cursor()
+        self.staging = None
+        self.codec = get_codec(compression)
+        self.use_fields("full")
+
+    @property
+    def write_table(self):
+        """The table inserts go to: the staging copy during a full sync, otherwise the live table"""
+        return self.staging or self.database_name
+
+    def open_table(self):
+        """Create the table and apply pending migrations, switching to a writable connection if needed"""
+        if self.readonly and not self._schema_is_current():
+            # The schema is missing or outdated, which only a writer can fix
+            self.connection = get_connection(self.database_path)
+            self.cursor = self.connection.cursor()
+        self.create_table()
+        run_migrations(self)
+
+    def migrations(self):
+        """List (version, description, function) schema upgrades applied after create_table"""
+        return []
+
+    def _schema_is_current(self):
+        try:
+            exists = self.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                  (self.database_name,))
+            return bool(exists) and is_current(self)
+        except sqlite3.OperationalError:
+            return False
     
     def execute(self, query, params=()):
-        self.cursor.execute(query, params)
-        return self.cursor.fetchall()
+        with metrics.phase("cache.query"):
+            self.cursor.execute(query, params)
+            return self.cursor.fetchall()
+
+    def iterate(self, query, params=(), batch_size=1000):
+        """Yield a query's rows, fetching batch_size at a time instead of materializing them all"""
+        cursor = self.connection.cursor()
+        try:
+            with metrics.phase("cache.query"):
+                cursor.execute(query, params)
+            while True:
+                with metrics.phase("cache.query"):
+                    rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+    def executemany(self, query, rows):
+        with metrics.phase("cache.write"):
+            self.cursor.executemany(query, rows)
+
+    def insert_many(self, query, rows, chunk_size=1000):
+        """Run a write statement with executemany, committing once per chunk"""
+        count = 0
+        rows = iter(rows)
+        while True:
+            # Rows are usually built lazily (JSON encoding and all), so this is timed on its own
+            with metrics.phase("cache.encode_rows"):
+                chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            self.executemany(query, chunk)
+            self.commit()
+            count += len(chunk)
+        metrics.count("cache.rows_written", count)
+        return count
+
+    def insert_query(self):
+        """INSERT_QUERY for the table being written; {json} placeholders store JSONB where SQLite supports it"""
+        return self.INSERT_QUERY.format(table=self.write_table, json="jsonb(?)" if JSONB else "?")
+
+    def use_fields(self, profile):
+        """Select the field profile that rows are written with"""
+        if profile not in self.FIELD_PROFILES:
+            raise ValueError(f"Unknown field profile: {profile} (available: {', '.join(self.FIELD_PROFILES)})")
+        self.fields = profile
+        self.skipped_fields = frozenset(self.FIELD_PROFILES[profile])
+
+    def compress(self, text):
+        return compress(text, self.codec)
+
+    def compression_sizes(self):
+        """Return (decompressed bytes, stored bytes) summed over COMPRESSED_COLUMNS"""
+        if not self.COMPRESSED_COLUMNS:
+            return 0, 0
+        original = " + ".join(f"decompressed_size({column})" for column in self.COMPRESSED_COLUMNS)
+        stored = " + ".join(f"COALESCE(length(CAST({column} AS BLOB)), 0)" for column in self.COMPRESSED_COLUMNS)
+        (original_size, stored_size), = self.execute(
+            f"SELECT COALESCE(SUM({original}), 0), COALESCE(SUM({stored}), 0) FROM {self.database_name}"
+        )
+        return original_size, stored_size
+
+    def columns(self):
+        """List the table's column names in schema order"""
+        return [row[1] for row in self.execute(f"PRAGMA table_info({self.database_name})")]
+
+    @staticmethod
+    def match_expression(query):
+        """Build an FTS5 query matching every search word as a prefix, or None if there are no words"""
+        words = re.findall(r"\w+", query)
+        if not words:
+            return None
+        return " ".join(f'"{word}"*' for word in words)
+
+    def add_column(self, column, column_type, table=None):
+        """Add a column to an existing table (this one by default), returning True if it was missing"""
+        table = table or self.database_name
+        columns = [row[1] for row in self.execute(f"PRAGMA table_info({table})")]
+        if column in columns:
+            return False
+        self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+        return True
+
+    def create_search_index(self):
+        """Create an external-content FTS5 index over SEARCH_COLUMNS, maintained by triggers"""
+        fts_table = f"{self.database_name}_fts"
+        exists = self.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts_table,))
+
+        columns = ", ".join(self.SEARCH_COLUMNS)
+        new_values = ", ".join(f"new.{column}" for column in self.SEARCH_COLUMNS)
+        old_values = ", ".join(f"old.{column}" for column in self.SEARCH_COLUMNS)
+        insert_new = f"INSERT INTO {fts_table}(rowid, {columns}) VALUES (new.rowid, {new_values});"
+        delete_old = (f"INSERT INTO {fts_table}({fts_table}, rowid, {columns}) "
+                      f"VALUES ('delete', old.rowid, {old_values});")
+
+        self.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+            {columns},
+            content='{self.database_name}',
+            content_rowid='rowid',
+            prefix='2 3',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """)
+        self.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_insert AFTER INSERT ON {self.database_name} BEGIN
+            {insert_new}
+        END
+        """)
+        self.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_delete AFTER DELETE ON {self.database_name} BEGIN
+            {delete_old}
+        END
+        """)
+        self.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_update AFTER UPDATE ON {self.database_name} BEGIN
+            {delete_old}
+            {insert_new}
+        END
+        """)
+
+        # Index rows cached before the search index existed
+        if not exists:
+            self.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+        self.commit()
+
+    def begin_staging(self, resume=False):
+        """Send writes to an empty shadow copy of the table, leaving the live table readable
+
+        With resume, the shadow table left by an interrupted sync is reused as is.
+        """
+        staging = self.database_name + self.STAGING_SUFFIX
+        if not resume:
+            self.drop_staging()
+            self.execute(self._schema_as(self.database_name, staging))
+            self.commit()
+        self.staging = staging
+
+    def has_staging(self):
+        return self._table_exists(self.database_name + self.STAGING_SUFFIX)
+
+    def drop_staging(self):
+        for name in [self.database_name, *self.derived_tables()]:
+            self.execute(f"DROP TABLE IF EXISTS {name}{self.STAGING_SUFFIX}")
+        self.commit()
+        self.staging = None
+
+    def swap_staging(self):
+        """Fill derived tables from the staging copy, then swap everything in with one transaction
+
+        SQLite can't rename indexes or move triggers, so they are recreated from the
+        live schema inside the swap transaction. Readers keep seeing the previous
+        snapshot until it commits.
+        """
+        derived = self.derived_tables()
+        for name, populate in derived.items():
+            self.execute(f"DROP TABLE IF EXISTS {name}{self.STAGING_SUFFIX}")
+            self.execute(self._schema_as(name, name + self.STAGING_SUFFIX))
+            self.execute(populate)
+            self.commit()
+
+        names = [self.database_name, *derived]
+        placeholders = ", ".join("?" * len(names))
+        schema = self.execute(f"""
+        SELECT sql FROM sqlite_master
+        WHERE type IN ('index', 'trigger') AND tbl_name IN ({placeholders}) AND sql IS NOT NULL
+        ORDER BY type
+        """, names)
+
+        self.commit()
+        self.execute("BEGIN IMMEDIATE")
+        try:
+            for name in names:
+                self.execute(f"DROP TABLE {name}")
+                self.execute(f"ALTER TABLE {name}{self.STAGING_SUFFIX} RENAME TO {name}")
+            for (sql,) in schema:
+                self.execute(sql)
+            self.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        self.staging = None
+
+    def derived_tables(self):
+        """Map tables rebuilt from this one to the INSERT that fills their staging copy"""
+        fts_table = f"{self.database_name}_fts"
+        if not self.SEARCH_COLUMNS or not self._table_exists(fts_table):
+            return {}
+        columns = ", ".join(self.SEARCH_COLUMNS)
+        return {
+            fts_table: f"INSERT INTO {fts_table}{self.STAGING_SUFFIX}(rowid, {columns}) "
+                       f"SELECT rowid, {columns} FROM {self.database_name}{self.STAGING_SUFFIX}"
+        }
+
+    def _table_exists(self, name):
+        return bool(self.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)))
+
+    def _schema_as(self, name, new_name):
+        """Get a table's CREATE statement, rewritten to create new_name instead"""
+        sql = self.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))[0][0]
+        return re.sub(rf'^(CREATE (?:VIRTUAL )?TABLE )["\']?{name}["\']?', rf'\g<1>{new_name}', sql, count=1)
+
+    def get_refresh_index(self):
+        """Map each cached row id to its (last refresh, date downloaded) pair"""
+        query = f"SELECT {self.ID_COLUMN}, {self.REFRESH_COLUMN}, date_downloaded FROM {self.database_name}"
+        return {
+            row_id: self.refresh_key(last_refresh, date_downloaded)
+            for row_id, last_refresh, date_downloaded in self.execute(query)
+        }
+
+    @staticmethod
+    def refresh_key(last_refresh, date_downloaded):
+        # Compare as text: the API may send numbers that SQLite stores in TEXT columns
+        return tuple(None if value is None else str(value) for value in (last_refresh, date_downloaded))
+
+    def delete_ids(self, row_ids, chunk_size=1000):
+        """Delete rows by primary key, returning the number removed"""
+        query = f"DELETE FROM {self.database_name} WHERE {self.ID_COLUMN} = ?"
+        return self.insert_many(query, ((row_id,) for row_id in row_ids), chunk_size)
 
     def clear_table(self):
         query = f"DELETE FROM {self.database_name}"
@@ -17,7 +286,8 @@ class DatabaseTable:
         self.commit()
 
     def commit(self):
-        self.connection.commit()
+        with metrics.phase("cache.commit"):
+            self.connection.commit()
 
     def close(self):
-        self.connection.close()
+        close_connections(self.database_path)
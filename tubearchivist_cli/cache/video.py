@@ -1,12 +1,51 @@
 from tubearchivist_cli.cache.table import DatabaseTable
+from tubearchivist_cli.cache.migrations import backfill, create_indexes
 import json
 
 
 class VideoTable(DatabaseTable):
-    def __init__(self):
-        super().__init__()
+    ID_COLUMN = "youtube_id"
+    REFRESH_COLUMN = "vid_last_refresh"
+    SEARCH_COLUMNS = ("title", "description", "tags")
+    # description and streams stay plain: the search index and video_streams triggers read them in SQL
+    COMPRESSED_COLUMNS = ("channel", "player", "playlist", "sponsorblock", "stats", "subtitles")
+    # search keeps what search, stats and redownload read; lean also drops descriptions, tags and streams
+    FIELD_PROFILES = {
+        "lean": ("category", "channel", "player", "playlist", "sponsorblock", "stats", "subtitles",
+                 "description", "tags", "streams"),
+        "search": ("category", "channel", "player", "playlist", "sponsorblock", "stats", "subtitles"),
+        "full": (),
+    }
+    JSON_COLUMNS = ("category", "tags", "channel", "player", "playlist", "sponsorblock", "stats", "streams",
+                    "subtitles")
+
+    # category and streams are only read through SQL json functions, so they are stored as JSONB
+    # where available; tags stay text because the search index tokenizes them
+    INSERT_QUERY = """
+    INSERT OR REPLACE INTO {table} (
+        youtube_id, title, description, published, date_downloaded, active, 
+        vid_last_refresh, vid_thumb_url, vid_type, media_url, media_size, 
+        comment_count, category, tags, channel, channel_id, channel_name, 
+        player, playlist, sponsorblock, stats, streams, subtitles, _index, _score
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {json}, ?, ?, ?, ?, ?, ?, ?, ?, {json}, ?, ?, ?)
+    """
+
+    # Expands {video}.streams into video_streams rows; {source} adds a FROM table when not in a trigger
+    STREAMS_SELECT = """
+        SELECT {video}.youtube_id,
+               json_extract(stream.value, '$.type'),
+               json_extract(stream.value, '$.codec'),
+               json_extract(stream.value, '$.width'),
+               json_extract(stream.value, '$.height'),
+               json_extract(stream.value, '$.bitrate')
+        FROM {source}json_each({video}.streams) AS stream
+        WHERE json_type({video}.streams) = 'array'
+    """
+
+    def __init__(self, readonly=False, compression=None):
+        super().__init__(readonly=readonly, compression=compression)
         self.database_name = "videos"
-        self.create_table()
+        self.open_table()
 
     def create_table(self):
         query = f"""
@@ -26,6 +65,8 @@ class VideoTable(DatabaseTable):
             category TEXT,
             tags TEXT,
             channel TEXT,
+            channel_id TEXT,
+            channel_name TEXT,
             player TEXT,
             playlist TEXT,
             sponsorblock TEXT,
@@ -39,21 +80,107 @@ class VideoTable(DatabaseTable):
         self.execute(query)
         self.commit()
 
-    def add_video(self, video_data):
-        query = """
-        INSERT OR REPLACE INTO videos (
-            youtube_id, title, description, published, date_downloaded, active, 
-            vid_last_refresh, vid_thumb_url, vid_type, media_url, media_size, 
-            comment_count, category, tags, channel, player, playlist, 
-            sponsorblock, stats, streams, subtitles, _index, _score
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    def migrations(self):
+        return [
+            (1, "add indexed channel_id/channel_name columns", self._migrate_channel_columns),
+            (2, "build full-text search index", self.create_search_index),
+            (3, "normalize streams into video_streams", self._migrate_video_streams),
+            (4, "index active, date_downloaded and media_size", self._migrate_filter_indexes),
+        ]
+
+    def create_streams_table(self):
+        """Create video_streams, one row per stream, maintained from the streams JSON by triggers
+
+        Returns True if the table did not exist before.
         """
+        exists = self.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'video_streams'")
+        self.execute("""
+        CREATE TABLE IF NOT EXISTS video_streams (
+            youtube_id TEXT NOT NULL,
+            type TEXT,
+            codec TEXT,
+            width INTEGER,
+            height INTEGER,
+            bitrate INTEGER
+        )
+        """)
+        self.execute("CREATE INDEX IF NOT EXISTS idx_video_streams_youtube_id ON video_streams (youtube_id)")
+        self.execute("CREATE INDEX IF NOT EXISTS idx_video_streams_height ON video_streams (height, youtube_id)")
+        self.execute("CREATE INDEX IF NOT EXISTS idx_video_streams_codec ON video_streams (codec, youtube_id)")
+
+        self.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS video_streams_insert AFTER INSERT ON {self.database_name} BEGIN
+            INSERT INTO video_streams {self.STREAMS_SELECT.format(video="new", source="")};
+        END
+        """)
+        self.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS video_streams_delete AFTER DELETE ON {self.database_name} BEGIN
+            DELETE FROM video_streams WHERE youtube_id = old.youtube_id;
+        END
+        """)
+        self.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS video_streams_update AFTER UPDATE OF streams ON {self.database_name} BEGIN
+            DELETE FROM video_streams WHERE youtube_id = old.youtube_id;
+            INSERT INTO video_streams {self.STREAMS_SELECT.format(video="new", source="")};
+        END
+        """)
+        self.commit()
+        return not exists
+
+    def derived_tables(self):
+        staging = self.database_name + self.STAGING_SUFFIX
+        return {
+            **super().derived_tables(),
+            "video_streams": f"INSERT INTO video_streams{self.STAGING_SUFFIX} "
+                             f"{self.STREAMS_SELECT.format(video=staging, source=f'{staging}, ')}"
+        }
 
-        # Extract and prepare data
-        values = (
+    def _migrate_channel_columns(self):
+        # Caches created before the channel columns existed get them backfilled from the JSON blob
+        if self.add_column("channel_id", "TEXT"):
+            self.add_column("channel_name", "TEXT")
+            backfill(self, f"""
+            UPDATE {self.database_name}
+            SET channel_id = json_extract(decompress(channel), '$.channel_id'),
+                channel_name = json_extract(decompress(channel), '$.channel_name')
+            WHERE rowid BETWEEN ? AND ?
+            """)
+        create_indexes(self, {"channel_id": "channel_id", "channel_name": "channel_name"})
+
+    def _migrate_video_streams(self):
+        # Normalize streams of videos cached before the table existed
+        if self.create_streams_table():
+            source = f"{self.database_name}, "
+            backfill(self, f"""
+            INSERT INTO video_streams
+            {self.STREAMS_SELECT.format(video=self.database_name, source=source)}
+            AND {self.database_name}.rowid BETWEEN ? AND ?
+            """)
+
+    def _migrate_filter_indexes(self):
+        create_indexes(self, {
+            "active": "active",
+            "date_downloaded": "date_downloaded",
+            "media_size": "media_size",
+        })
+
+    def add_video(self, video_data):
+        self.execute(self.insert_query(), self._video_values(video_data))
+        self.commit()
+
+    def add_videos(self, videos, chunk_size=1000):
+        """Insert videos in chunked transactions, returning the number written"""
+        query = self.insert_query()
+        return self.insert_many(query, map(self._video_values, videos), chunk_size)
+
+    def _video_values(self, video_data):
+        channel = video_data.get('channel') or {}
+        # Fields outside the field profile are stored as NULL without being encoded
+        skipped = self.skipped_fields
+        return (
             video_data.get('youtube_id'),
             video_data.get('title'),
-            video_data.get('description'),
+            None if 'description' in skipped else video_data.get('description'),
             video_data.get('published'),
             video_data.get('date_downloaded'),
             video_data.get('active'),
@@ -63,18 +190,17 @@ class VideoTable(DatabaseTable):
             video_data.get('media_url'),
             video_data.get('media_size'),
             video_data.get('comment_count'),
-            json.dumps(video_data.get('category', [])),
-            json.dumps(video_data.get('tags', [])),
-            json.dumps(video_data.get('channel', {})),
-            json.dumps(video_data.get('player', {})),
-            json.dumps(video_data.get('playlist', [])),
-            json.dumps(video_data.get('sponsorblock')),
-            json.dumps(video_data.get('stats', {})),
-            json.dumps(video_data.get('streams', [])),
-            json.dumps(video_data.get('subtitles', [])),
+            None if 'category' in skipped else json.dumps(video_data.get('category', [])),
+            None if 'tags' in skipped else json.dumps(video_data.get('tags', [])),
+            None if 'channel' in skipped else self.compress(json.dumps(video_data.get('channel', {}))),
+            channel.get('channel_id'),
+            channel.get('channel_name'),
+            None if 'player' in skipped else self.compress(json.dumps(video_data.get('player', {}))),
+            None if 'playlist' in skipped else self.compress(json.dumps(video_data.get('playlist', []))),
+            None if 'sponsorblock' in skipped else self.compress(json.dumps(video_data.get('sponsorblock'))),
+            None if 'stats' in skipped else self.compress(json.dumps(video_data.get('stats', {}))),
+            None if 'streams' in skipped else json.dumps(video_data.get('streams', [])),
+            None if 'subtitles' in skipped else self.compress(json.dumps(video_data.get('subtitles', []))),
             video_data.get('_index'),
             video_data.get('_score')
         )
-
-        self.execute(query, values)
-        self.commit()
@@ -1,10 +1,163 @@
+import sys
 from sys import argv
 
 
+def parse_options(args):
+    """Split `--name` / `--name=value` options from positional arguments"""
+    positional = []
+    options = {}
+    for arg in args:
+        if arg.startswith("--"):
+            name, _, value = arg[2:].partition("=")
+            options[name.replace("-", "_")] = value or True
+        else:
+            positional.append(arg)
+    return positional, options
+
+
+class OptionError(Exception):
+    """An option was given a value the command can't use
+
+    Commands read their options with the helpers below before connecting,
+    so a typo is reported without costing a round trip to the server.
+    """
+
+
+def number_option(options, name, default, convert=int, minimum=None):
+    """Read a numeric option, raising OptionError naming the option if it is malformed or below minimum"""
+    flag = f"--{name.replace('_', '-')}"
+    value = options.get(name, default)
+    if value is True:
+        raise OptionError(f"{flag} needs a value, e.g. {flag}=<n>")
+    try:
+        number = convert(value)
+    except (TypeError, ValueError):
+        kind = "a whole number" if convert is int else "a number"
+        raise OptionError(f"{flag} must be {kind}, got '{value}'") from None
+    # Written so that NaN fails the check as well
+    if minimum is not None and not number >= minimum:
+        raise OptionError(f"{flag} must be at least {minimum}, got {value}")
+    return number
+
+
+def choice_option(options, name, choices, default=None):
+    """Read an option that takes one of a fixed set of values, raising OptionError otherwise"""
+    flag = f"--{name.replace('_', '-')}"
+    value = options.get(name, default)
+    if value is True:
+        raise OptionError(f"{flag} needs a value, e.g. {flag}={next(iter(choices))}")
+    if value is not None and value not in choices:
+        raise OptionError(f"{flag} must be one of {', '.join(choices)}, got '{value}'")
+    return value
+
+
+def text_option(options, name):
+    """Read an option that takes a free-form value, raising OptionError if it was given without one"""
+    flag = f"--{name.replace('_', '-')}"
+    value = options.get(name)
+    if value is True:
+        raise OptionError(f"{flag} needs a value, e.g. {flag}=<value>")
+    return value
+
+
+def list_option(options, name, choices):
+    """Read a comma-separated list option whose items must all be in choices"""
+    flag = f"--{name.replace('_', '-')}"
+    value = text_option(options, name)
+    if value is None:
+        return None
+    items = value.split(",")
+    unknown = [item for item in items if item not in choices]
+    if unknown:
+        raise OptionError(f"{flag} has unknown value(s) {', '.join(unknown)} (available: {', '.join(choices)})")
+    return items
+
+
+def date_option(options, name):
+    """Read a YYYY-MM-DD option as a datetime"""
+    from datetime import datetime
+    flag = f"--{name.replace('_', '-')}"
+    value = text_option(options, name)
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise OptionError(f"{flag} must be a date like 2024-01-31, got '{value}'") from None
+
+
+def create_client(options, concurrency):
+    """Build the API client for a command; `--async` selects the asyncio client
+
+    The command is handed this client so the health check and every request
+    share one session; commands only build their own when given none.
+    """
+    timeout = number_option(options, "timeout", 30, float, minimum=0.1)
+    if options.get("async"):
+        from tubearchivist_cli.api.async_client import AsyncTubeArchivistAPI
+        try:
+            return AsyncTubeArchivistAPI(concurrency=concurrency, timeout=timeout)
+        except ImportError:
+            raise OptionError("--async needs aiohttp: install it (pip install aiohttp) or drop --async") from None
+    from tubearchivist_cli.api.client import TubeArchivistAPI
+    return TubeArchivistAPI(concurrency=concurrency, timeout=(5, timeout))
+
+
+def test_connection(client):
+    import inspect
+    result = client.test_connection()
+    if inspect.isawaitable(result):
+        result = client.run(result)
+    return result
+
+
 def main():
-    print("Welcome to the TubeArchivist CLI!")
-    args = argv[1:]
-    
+    args, options = parse_options(argv[1:])
+    # An export may be writing its data to stdout, so nothing else an export run
+    # prints goes there: no banner, and status, profile and metrics go to stderr
+    if args[:1] != ["export"]:
+        print("Welcome to the TubeArchivist CLI!")
+    try:
+        if options.get("profile") or options.get("metrics"):
+            run_instrumented(args, options)
+        else:
+            run(args, options)
+    except OptionError as e:
+        print(f"Invalid option: {e}", file=sys.stderr)
+        sys.exit(2)
+
+
+def run_instrumented(args, options):
+    """Run a command under cProfile (--profile) and/or report its timers and counters (--metrics)"""
+    import time
+    from tubearchivist_cli import metrics
+
+    command = " ".join(args[:2]) or "help"
+    profile = options.get("profile")
+    if profile is True:
+        profile = f"tube-{'-'.join(args[:2]) or 'help'}.pstats"
+    messages = sys.stderr if args[:1] == ["export"] else sys.stdout
+    started = time.perf_counter()
+    try:
+        if profile:
+            metrics.profile(lambda: run(args, options), profile)
+        else:
+            run(args, options)
+    finally:
+        if profile:
+            print(f"Profile written to {profile} (inspect it with: python -m pstats {profile})", file=messages)
+        if options.get("metrics"):
+            import json
+            report = json.dumps(metrics.report(command, time.perf_counter() - started), indent=2)
+            if options["metrics"] is True:
+                print(report, file=messages)
+            else:
+                with open(options["metrics"], "w") as output:
+                    output.write(report + "\n")
+                print(f"Metrics written to {options['metrics']}", file=messages)
+
+
+def run(args, options):
     if not args:
         from tubearchivist_cli.cli.help import Help
         Help().show()
@@ -27,33 +180,64 @@ def main():
                 Help().show_command("config")
                 
         case "sync":
-            from tubearchivist_cli.api.client import TubeArchivistAPI
+            from tubearchivist_cli.api.base import ConfigurationError
             from tubearchivist_cli.cli.sync import Sync
+            from tubearchivist_cli.cache.lock import LockedError
+            import requests
+            from tubearchivist_cli.cache.compression import CODECS
+            from tubearchivist_cli.cache.video import VideoTable
+            if not action:
+                from tubearchivist_cli.cli.help import Help
+                Help().show_command("sync")
+                return
+            if action not in Sync.ACTIONS:
+                raise OptionError(f"Unknown sync action: {action} (available: {', '.join(Sync.ACTIONS)})")
+            concurrency = number_option(options, "concurrency", 4, minimum=1)
+            compression = choice_option(options, "compression", [*CODECS, "none"])
+            fields = choice_option(options, "fields", VideoTable.FIELD_PROFILES)
             try:
-                client = TubeArchivistAPI()
-                if client.test_connection():
-                    sync = Sync()
-                    if action:
-                        if hasattr(sync, action):
-                            getattr(sync, action)()
-                        else:
-                            print(f"Invalid sync action: {action}")
-                    else:
-                        from tubearchivist_cli.cli.help import Help
-                        Help().show_command("sync")
+                client = create_client(options, concurrency=concurrency)
+                if test_connection(client):
+                    sync = Sync(
+                        client=client,
+                        incremental=bool(options.get("incremental")),
+                        resume=bool(options.get("resume")),
+                        compression=compression,
+                        fields=fields
+                    )
+                    try:
+                        getattr(sync, action)()
+                    except (KeyboardInterrupt, ConnectionError, requests.RequestException) as e:
+                        # Every committed page is checkpointed, so the sync can pick up from there
+                        interrupted = isinstance(e, KeyboardInterrupt)
+                        print("" if interrupted else f"\nSync failed: {e}", file=sys.stderr)
+                        for hint in sync.resume_hints() or ["Sync interrupted."]:
+                            print(hint, file=sys.stderr)
+                        sys.exit(130 if interrupted else 1)
                 else:
                     raise ConnectionError("Failed to connect to the API.")
-            except ValueError as e:
+            except ConfigurationError as e:
                 print(f"Configuration error: {e}")
                 print("Please run 'config set' to configure the API connection.")
+            except LockedError as e:
+                print(e, file=sys.stderr)
+                sys.exit(1)
         
         case "redownload":
-            from tubearchivist_cli.api.client import TubeArchivistAPI
+            from tubearchivist_cli.api.base import ConfigurationError
             from tubearchivist_cli.cli.redownload import Redownload
+            batch_size = number_option(options, "batch_size", 50, minimum=1)
+            concurrency = number_option(options, "concurrency", 1, minimum=1)
+            rate_limit = number_option(options, "rate_limit", 2.0, float, minimum=0)
             try:
-                client = TubeArchivistAPI()
-                if client.test_connection():
-                    redownload = Redownload()
+                client = create_client(options, concurrency=concurrency)
+                if test_connection(client):
+                    redownload = Redownload(
+                        client=client,
+                        batch_size=batch_size,
+                        concurrency=concurrency,
+                        rate_limit=rate_limit
+                    )
                     if action == "resolution":
                         # Get the resolution argument
                         resolution = args[2] if len(args) > 2 else None
@@ -68,7 +252,7 @@ def main():
                         Help().show_command("redownload")
                 else:
                     raise ConnectionError("Failed to connect to the API.")
-            except ValueError as e:
+            except ConfigurationError as e:
                 print(f"Configuration error: {e}")
                 print("Please run 'config set' to configure the API connection.")
         
@@ -83,6 +267,34 @@ def main():
             else:
                 stats.overview()
                 
+        case "export":
+            from tubearchivist_cli.cli.export import Export
+            from tubearchivist_cli.cache.table import DatabaseTable
+            if not action:
+                from tubearchivist_cli.cli.help import Help
+                Help().show_command("export")
+                return
+            if action not in Export.TABLES:
+                raise OptionError(f"Unknown export action: {action} (available: {', '.join(Export.TABLES)})")
+            # Checked before the output is opened, so a bad option never leaves an empty export behind
+            export_format = choice_option(options, "format", Export.FORMATS, default="jsonl")
+            since = date_option(options, "since")
+            search = text_option(options, "search")
+            if search is not None and not DatabaseTable.match_expression(search):
+                raise OptionError(f"--search needs at least one word to match, got '{search}'")
+            columns = list_option(options, "columns", Export.TABLES[action](readonly=True).columns())
+            export = Export(
+                format=export_format,
+                output=text_option(options, "output"),
+                columns=columns,
+                gzip=bool(options.get("gzip")),
+                channel=text_option(options, "channel"),
+                search=search,
+                active=True if options.get("active") else False if options.get("inactive") else None,
+                since=since
+            )
+            getattr(export, action)()
+
         case "help":
             from tubearchivist_cli.cli.help import Help
             help_system = Help()
@@ -93,11 +305,15 @@ def main():
                 
         case "search":
             from tubearchivist_cli.cli.search import Search
-            search = Search()
+            search = Search(
+                limit=number_option(options, "limit", None, minimum=1) if "limit" in options else None,
+                offset=number_option(options, "offset", 0, minimum=0),
+                count_only=bool(options.get("count_only"))
+            )
             if action == "videos":
                 # Get the search query argument
                 query = " ".join(args[2:]) if len(args) > 2 else None
-                search.videos(query)
+                search.videos(query, channel=text_option(options, "channel"))
             elif action == "channels":
                 query = " ".join(args[2:]) if len(args) > 2 else None
                 search.channels(query)
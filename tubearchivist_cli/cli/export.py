@@ -0,0 +1,142 @@
+from tubearchivist_cli.cache.video import VideoTable
+from tubearchivist_cli.cache.playlist import PlaylistTable
+from tubearchivist_cli.cache.channel import ChannelTable
+from tubearchivist_cli.cache.sync_state import SyncStateTable
+from itertools import islice
+import sys
+import time
+
+
+class Export:
+    """Export cached data as JSON Lines or CSV, to stdout or a file"""
+
+    FORMATS = ("jsonl", "csv")
+    # What each action exports, so the CLI can check --columns before anything is written
+    TABLES = {"videos": VideoTable, "channels": ChannelTable, "playlists": PlaylistTable}
+
+    def __init__(self, format="jsonl", output=None, columns=None, gzip=False, channel=None,
+                 search=None, active=None, since=None, batch_size=1000):
+        # Options arrive validated: columns as a list of names, since as a datetime
+        self.format = format
+        self.output = output
+        self.columns = columns
+        # Gzip when asked to, or when the output file name says so
+        self.gzip = gzip or bool(output and output.endswith(".gz"))
+        self.channel = channel
+        self.search = search
+        self.active = active
+        self.since = since
+        self.batch_size = batch_size
+        self.video_table = VideoTable(readonly=True)
+        self.playlist_table = PlaylistTable(readonly=True)
+        self.channel_table = ChannelTable(readonly=True)
+        self.sync_state_table = SyncStateTable(readonly=True)
+
+    def videos(self):
+        """Export cached videos"""
+        self._export(self.video_table, "date_downloaded", ("channel_id", "channel_name"))
+
+    def channels(self):
+        """Export cached channels"""
+        self._export(self.channel_table, "date_downloaded", ("channel_id", "channel_name"))
+
+    def playlists(self):
+        """Export cached playlists"""
+        self._export(self.playlist_table, "date_downloaded", ("playlist_channel_id", "playlist_channel"))
+
+    def _export(self, table, date_column, channel_columns):
+        """Stream the selected rows and columns of a table to the output, batch_size rows at a time"""
+        columns = self.columns or table.columns()
+        missing = self.sync_state_table.missing_fields(table, columns)
+        if missing:
+            self._status(f"Warning: {table.database_name} were synced without {', '.join(missing)}, so "
+                         f"{'those columns are' if len(missing) > 1 else 'that column is'} empty in this export. "
+                         f"Run 'sync {table.database_name} --fields=full' to include them.")
+        conditions, params = self._filters(table, date_column, channel_columns)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"SELECT {self._select(table, columns)} FROM {table.database_name} {where} ORDER BY rowid"
+
+        started = time.monotonic()
+        count = 0
+        output = self._open()
+        try:
+            rows = table.iterate(query, params, self.batch_size)
+            if self.format == "csv":
+                import csv
+                writer = csv.writer(output)
+                writer.writerow(columns)
+                while batch := list(islice(rows, self.batch_size)):
+                    writer.writerows(batch)
+                    count += len(batch)
+            else:
+                # SQLite builds each JSON line itself, so Python never decodes a row
+                while batch := list(islice(rows, self.batch_size)):
+                    output.writelines(f"{line}\n" for (line,) in batch)
+                    count += len(batch)
+        except BrokenPipeError:
+            # The reader went away (e.g. `| head`); point stdout at devnull so the exit flush can't fail again
+            import os
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return
+        finally:
+            if output is sys.stdout:
+                output.flush()
+            else:
+                output.close()
+
+        destination = self.output or "stdout"
+        self._status(f"Exported {count:,} {table.database_name} to {destination} in {time.monotonic() - started:.1f}s.")
+
+    def _select(self, table, columns):
+        """Build the select list: JSON lines as one json_object(), CSV as one expression per column"""
+        expressions = []
+        for column in columns:
+            expression = column
+            if column in table.COMPRESSED_COLUMNS:
+                expression = f"decompress({column})"
+            if column in table.JSON_COLUMNS:
+                # json() turns JSONB into text, and marks text as JSON so json_object() nests it
+                expression = f"json({expression})"
+            expressions.append((column, expression))
+        if self.format == "csv":
+            return ", ".join(expression for _, expression in expressions)
+        return "json_object(" + ", ".join(f"'{column}', {expression}" for column, expression in expressions) + ")"
+
+    def _filters(self, table, date_column, channel_columns):
+        """Build WHERE conditions and their parameters from the filter options"""
+        conditions = []
+        params = []
+        if self.channel:
+            conditions.append(f"({channel_columns[0]} = ? OR {channel_columns[1]} = ?)")
+            params += [self.channel, self.channel]
+        if self.active is not None:
+            conditions.append("active = ?")
+            params.append(1 if self.active else 0)
+        if self.since:
+            conditions.append(f"{date_column} >= ?")
+            params.append(int(self.since.timestamp()))
+        if self.search:
+            fts_table = f"{table.database_name}_fts"
+            conditions.append(f"rowid IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ?)")
+            params.append(table.match_expression(self.search))
+        return conditions, params
+
+    def _open(self):
+        """Open the output as a text stream: a file or stdout, gzipped if requested"""
+        newline = "" if self.format == "csv" else None
+        if self.gzip:
+            import gzip
+            import io
+            if self.output:
+                return gzip.open(self.output, "wt", encoding="utf-8", newline=newline)
+            # An empty name keeps "<stdout>" out of the gzip header
+            return io.TextIOWrapper(gzip.GzipFile(filename="", mode="wb", fileobj=sys.stdout.buffer),
+                                    encoding="utf-8", newline=newline)
+        if self.output:
+            return open(self.output, "w", encoding="utf-8", newline=newline)
+        return sys.stdout
+
+    @staticmethod
+    def _status(message):
+        """Print a progress message to stderr"""
+        print(message, file=sys.stderr)
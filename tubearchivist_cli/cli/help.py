@@ -1,6 +1,4 @@
-import inspect
-import importlib
-import os
+import ast
 from pathlib import Path
 
 
@@ -10,7 +8,11 @@ class Help:
         self.commands = self._discover_commands()
 
     def _discover_commands(self):
-        """Dynamically discover all CLI command modules and their methods"""
+        """Discover CLI commands and their methods from source, without importing the modules
+
+        Importing every command module would pull in requests and the cache layer
+        just to print help, so docstrings are read from the syntax tree instead.
+        """
         commands = {}
         
         # Get all Python files in the CLI directory except __init__.py and help.py
@@ -20,50 +22,56 @@ class Help:
             
             module_name = file.stem
             try:
-                # Import the module dynamically
-                module = importlib.import_module(f"tubearchivist_cli.cli.{module_name}")
-                
-                # Find the main class (should be capitalized version of module name)
-                class_name = module_name.capitalize()
-                if hasattr(module, class_name):
-                    cls = getattr(module, class_name)
-                    
-                    # Get public methods (not starting with _)
-                    methods = []
-                    for method_name in dir(cls):
-                        if not method_name.startswith('_') and callable(getattr(cls, method_name)):
-                            method = getattr(cls, method_name)
-                            # Only include methods with docstrings
-                            description = self._get_method_description(method)
-                            if description:  # Only add if we have a description
-                                methods.append({
-                                    'name': method_name,
-                                    'description': description
-                                })
-                    
-                    if methods:
-                        # Get class docstring for command description
-                        class_description = self._get_class_description(cls)
-                        if class_description:  # Only add if we have a description
-                            commands[module_name] = {
-                                'description': class_description,
-                                'methods': methods
-                            }
-            except ImportError:
+                tree = ast.parse(file.read_text(encoding="utf-8"))
+            except (OSError, SyntaxError):
+                continue
+            
+            # Find the main class (should be capitalized version of module name)
+            class_name = module_name.capitalize()
+            cls = next((node for node in tree.body
+                        if isinstance(node, ast.ClassDef) and node.name == class_name), None)
+            if cls is None:
                 continue
+            
+            # Classes that list their actions in ACTIONS get only those; others all public methods
+            actions = self._get_actions(cls)
+            methods = []
+            for node in sorted(cls.body, key=lambda node: getattr(node, 'name', '')):
+                if not isinstance(node, ast.FunctionDef) or node.name.startswith('_'):
+                    continue
+                if actions is None or node.name in actions:
+                    # Only include methods with docstrings
+                    description = self._get_description(node)
+                    if description:  # Only add if we have a description
+                        methods.append({
+                            'name': node.name,
+                            'description': description
+                        })
+            
+            if methods:
+                # Get class docstring for command description
+                class_description = self._get_description(cls)
+                if class_description:  # Only add if we have a description
+                    commands[module_name] = {
+                        'description': class_description,
+                        'methods': methods
+                    }
         
         return commands
 
-    def _get_class_description(self, cls):
-        """Get class description from docstring only"""
-        if cls.__doc__:
-            return cls.__doc__.strip().split('\n')[0]
+    def _get_actions(self, cls):
+        """Get the ACTIONS tuple a class node assigns, or None if it has none"""
+        for node in cls.body:
+            if (isinstance(node, ast.Assign)
+                    and any(isinstance(target, ast.Name) and target.id == "ACTIONS" for target in node.targets)):
+                return ast.literal_eval(node.value)
         return None
 
-    def _get_method_description(self, method):
-        """Get method description from docstring only"""
-        if method.__doc__:
-            return method.__doc__.strip().split('\n')[0]
+    def _get_description(self, node):
+        """Get the first docstring line of a class or function node"""
+        docstring = ast.get_docstring(node)
+        if docstring:
+            return docstring.strip().split('\n')[0]
         return None
 
     def show(self):
@@ -1,15 +1,20 @@
 from tubearchivist_cli.api.client import TubeArchivistAPI
 from tubearchivist_cli.cache.video import VideoTable
-import json
-import time
+from tubearchivist_cli.cache.sync_state import SyncStateTable
+import inspect
 
 
 class Redownload:
     """Redownload videos based on resolution or other criteria"""
 
-    def __init__(self):
-        self.client = TubeArchivistAPI()
+    def __init__(self, client=None, batch_size=50, concurrency=1, rate_limit=2.0):
+        self.client = client or TubeArchivistAPI()
         self.video_table = VideoTable()
+        self.sync_state_table = SyncStateTable(readonly=True)
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        # Maximum download-queue requests per second
+        self.rate_limit = rate_limit
 
     def resolution(self, target_resolution):
         """Redownload all videos with the specified resolution"""
@@ -20,6 +25,9 @@ class Redownload:
             return
 
         print(f"Searching for videos with {target_resolution}p resolution...")
+        if self.sync_state_table.missing_fields(self.video_table, ["streams"]):
+            print("Warning: videos were synced without stream details, so no resolutions are known. "
+                  "Run 'sync videos --fields=search' first.")
         
         # Query videos with the target resolution
         videos = self._get_videos_by_resolution(target_resolution)
@@ -36,55 +44,23 @@ class Redownload:
             print("Operation cancelled.")
             return
 
-        # Redownload each video
-        success_count = 0
-        failed_count = 0
-        
-        for i, video in enumerate(videos, 1):
-            video_id = video[0]
-            title = video[1]
-            
-            print(f"[{i}/{len(videos)}] Redownloading: {title} ({video_id})")
-            
-            if self.client.redownload_video(video_id):
-                success_count += 1
-            else:
-                failed_count += 1
-                print(f"  ❌ Failed to queue {video_id}")
-            
-            # Add a small delay to avoid overwhelming the API
-            time.sleep(0.5)
-
-        print(f"\nRedownload Summary:")
-        print(f"✅ Successfully queued: {success_count}")
-        print(f"❌ Failed: {failed_count}")
-        print(f"📥 Total videos processed: {len(videos)}")
+        self._redownload(videos)
 
     def _get_videos_by_resolution(self, target_resolution):
         """Get videos from cache that have the specified resolution"""
+        try:
+            height = int(target_resolution)
+        except ValueError:
+            print(f"Invalid resolution: {target_resolution}")
+            return []
+
         query = """
-        SELECT youtube_id, title, streams 
-        FROM videos 
-        WHERE streams IS NOT NULL AND streams != ''
+        SELECT v.youtube_id, v.title
+        FROM videos v
+        WHERE v.youtube_id IN (SELECT youtube_id FROM video_streams WHERE height = ?)
         """
         
-        results = self.video_table.execute(query)
-        matching_videos = []
-        
-        for video_id, title, streams_json in results:
-            try:
-                if streams_json:
-                    streams = json.loads(streams_json)
-                    # Check if any stream matches the target resolution
-                    for stream in streams:
-                        if stream.get('height') == int(target_resolution):
-                            matching_videos.append((video_id, title, streams_json))
-                            break
-            except (json.JSONDecodeError, ValueError):
-                # Skip videos with invalid stream data
-                continue
-        
-        return matching_videos
+        return self.video_table.execute(query, (height,))
 
     def failed(self):
         """Redownload videos that previously failed to download"""
@@ -111,23 +87,26 @@ class Redownload:
             print("Operation cancelled.")
             return
 
-        # Redownload each failed video
-        success_count = 0
-        failed_count = 0
-        
-        for i, (video_id, title) in enumerate(results, 1):
-            print(f"[{i}/{len(results)}] Redownloading failed: {title} ({video_id})")
-            
-            if self.client.redownload_video(video_id):
-                success_count += 1
-            else:
-                failed_count += 1
-                print(f"  ❌ Failed to queue {video_id}")
-            
-            # Add a small delay to avoid overwhelming the API
-            time.sleep(0.5)
+        self._redownload(results)
+
+    def _redownload(self, videos):
+        """Queue (video_id, title) pairs in batches and print a summary"""
+        print(f"Queueing {len(videos)} videos in batches of {self.batch_size}...")
+        titles = dict(videos)
+        results = self.client.redownload_videos(
+            list(titles),
+            batch_size=self.batch_size,
+            concurrency=self.concurrency,
+            rate_limit=self.rate_limit
+        )
+        if inspect.isawaitable(results):
+            results = self.client.run(results)
+
+        failed = [video_id for video_id, queued in results.items() if not queued]
+        for video_id in failed:
+            print(f"  ❌ Failed to queue {titles[video_id]} ({video_id})")
 
         print(f"\nRedownload Summary:")
-        print(f"✅ Successfully queued: {success_count}")
-        print(f"❌ Failed: {failed_count}")
+        print(f"✅ Successfully queued: {len(results) - len(failed)}")
+        print(f"❌ Failed: {len(failed)}")
         print(f"📥 Total videos processed: {len(results)}")
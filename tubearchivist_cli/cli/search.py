@@ -1,69 +1,61 @@
 from tubearchivist_cli.cache.video import VideoTable
 from tubearchivist_cli.cache.playlist import PlaylistTable
 from tubearchivist_cli.cache.channel import ChannelTable
-import json
+from tubearchivist_cli.cache.sync_state import SyncStateTable
+from itertools import chain, islice
+import sys
 
 
 class Search:
     """Search through cached TubeArchivist data"""
 
-    def __init__(self):
-        self.video_table = VideoTable()
-        self.playlist_table = PlaylistTable()
-        self.channel_table = ChannelTable()
+    # Counted by SQLite, which reads JSONB and JSON text alike, so entries are never decoded in Python
+    ENTRY_COUNT = ("CASE WHEN json_type(p.playlist_entries) = 'array' "
+                   "THEN json_array_length(p.playlist_entries) ELSE 0 END")
 
-    def videos(self, query=None):
+    def __init__(self, limit=None, offset=0, count_only=False):
+        # Which page of matches the detailed searches print, or only how many there are
+        self.limit = limit
+        self.offset = offset
+        self.count_only = count_only
+        self.video_table = VideoTable(readonly=True)
+        self.playlist_table = PlaylistTable(readonly=True)
+        self.channel_table = ChannelTable(readonly=True)
+        self.sync_state_table = SyncStateTable(readonly=True)
+
+    def videos(self, query=None, channel=None):
         """Search videos by title, description, or tags"""
         if not query:
             print("Error: Search query is required")
-            print("Usage: python tube.py search videos <query>")
+            print("Usage: python tube.py search videos <query> [--channel=<name or id>]")
             return
 
         print(f"Searching videos for: '{query}'")
+        self._warn_missing_fields(self.video_table)
         
-        # Search in title, description, and tags
-        sql_query = """
-        SELECT youtube_id, title, published, channel, tags
-        FROM videos 
-        WHERE title LIKE ? OR description LIKE ? OR tags LIKE ?
-        ORDER BY title
-        """
-        
-        search_term = f"%{query}%"
-        results = self.video_table.execute(sql_query, (search_term, search_term, search_term))
-        
-        if not results:
-            print("No videos found matching your search.")
-            return
+        # Full-text search over title, description and tags, best matches first
+        channel_filter = ""
+        params = ()
+        if channel:
+            print(f"Channel filter: '{channel}'")
+            channel_filter = "AND (v.channel_id = ? OR v.channel_name = ?)"
+            params = (channel, channel)
 
-        print(f"Found {len(results)} video(s):")
-        print("-" * 80)
-        
-        for video_id, title, published, channel_json, tags_json in results:
-            # Parse channel info
-            channel_name = "Unknown Channel"
-            try:
-                if channel_json:
-                    channel_data = json.loads(channel_json)
-                    channel_name = channel_data.get('channel_name', 'Unknown Channel')
-            except:
-                pass
-            
-            # Parse tags
-            tags = []
-            try:
-                if tags_json:
-                    tags = json.loads(tags_json)
-            except:
-                pass
-            
-            print(f"Title: {title}")
-            print(f"ID: {video_id}")
-            print(f"Channel: {channel_name}")
-            print(f"Published: {published or 'Unknown'}")
-            if tags:
-                print(f"Tags: {', '.join(tags[:5])}")  # Show first 5 tags
-            print("-" * 80)
+        columns = """
+        v.youtube_id, v.title, v.published, v.channel_name,
+        (SELECT group_concat(value, ', ') FROM (
+            SELECT value FROM json_each(CASE WHEN json_type(v.tags) = 'array' THEN v.tags END)
+            LIMIT 5
+        )),
+        snippet(videos_fts, -1, '[', ']', '...', 12)
+        """
+        source = f"""
+        FROM videos_fts
+        JOIN videos v ON v.rowid = videos_fts.rowid
+        WHERE videos_fts MATCH ? {channel_filter}
+        """
+        order = "ORDER BY bm25(videos_fts, 10.0, 1.0, 5.0)"
+        self._search(self.video_table, "video", columns, source, order, query, params, self._format_video)
 
     def channels(self, query=None):
         """Search channels by name or description"""
@@ -73,42 +65,16 @@ class Search:
             return
 
         print(f"Searching channels for: '{query}'")
+        self._warn_missing_fields(self.channel_table)
         
-        sql_query = """
-        SELECT channel_id, channel_name, channel_description, channel_subscribed, active
-        FROM channels 
-        WHERE channel_name LIKE ? OR channel_description LIKE ?
-        ORDER BY channel_name
+        columns = "c.channel_id, c.channel_name, c.channel_description, c.channel_subscribed, c.active"
+        source = """
+        FROM channels_fts
+        JOIN channels c ON c.rowid = channels_fts.rowid
+        WHERE channels_fts MATCH ?
         """
-        
-        search_term = f"%{query}%"
-        results = self.channel_table.execute(sql_query, (search_term, search_term))
-        
-        if not results:
-            print("No channels found matching your search.")
-            return
-
-        print(f"Found {len(results)} channel(s):")
-        print("-" * 80)
-        
-        for channel_id, name, description, subscribed, active in results:
-            status_indicators = []
-            if subscribed:
-                status_indicators.append("📺 Subscribed")
-            if active:
-                status_indicators.append("✅ Active")
-            else:
-                status_indicators.append("❌ Inactive")
-            
-            print(f"Name: {name}")
-            print(f"ID: {channel_id}")
-            if status_indicators:
-                print(f"Status: {' | '.join(status_indicators)}")
-            if description:
-                # Truncate long descriptions
-                desc = description[:200] + "..." if len(description) > 200 else description
-                print(f"Description: {desc}")
-            print("-" * 80)
+        order = "ORDER BY bm25(channels_fts, 10.0, 1.0)"
+        self._search(self.channel_table, "channel", columns, source, order, query, (), self._format_channel)
 
     def playlists(self, query=None):
         """Search playlists by name or description"""
@@ -118,47 +84,19 @@ class Search:
             return
 
         print(f"Searching playlists for: '{query}'")
+        self._warn_missing_fields(self.playlist_table)
         
-        sql_query = """
-        SELECT playlist_id, playlist_name, playlist_description, playlist_channel, playlist_entries, active
-        FROM playlists 
-        WHERE playlist_name LIKE ? OR playlist_description LIKE ?
-        ORDER BY playlist_name
+        columns = f"""
+        p.playlist_id, p.playlist_name, p.playlist_description, p.playlist_channel,
+        {self.ENTRY_COUNT}, p.active
         """
-        
-        search_term = f"%{query}%"
-        results = self.playlist_table.execute(sql_query, (search_term, search_term))
-        
-        if not results:
-            print("No playlists found matching your search.")
-            return
-
-        print(f"Found {len(results)} playlist(s):")
-        print("-" * 80)
-        
-        for playlist_id, name, description, channel, entries_json, active in results:
-            # Count entries
-            entry_count = 0
-            try:
-                if entries_json:
-                    entries = json.loads(entries_json)
-                    if isinstance(entries, list):
-                        entry_count = len(entries)
-            except:
-                pass
-            
-            status = "✅ Active" if active else "❌ Inactive"
-            
-            print(f"Name: {name}")
-            print(f"ID: {playlist_id}")
-            print(f"Channel: {channel or 'Unknown'}")
-            print(f"Entries: {entry_count}")
-            print(f"Status: {status}")
-            if description:
-                # Truncate long descriptions
-                desc = description[:200] + "..." if len(description) > 200 else description
-                print(f"Description: {desc}")
-            print("-" * 80)
+        source = """
+        FROM playlists_fts
+        JOIN playlists p ON p.rowid = playlists_fts.rowid
+        WHERE playlists_fts MATCH ?
+        """
+        order = "ORDER BY bm25(playlists_fts, 10.0, 1.0)"
+        self._search(self.playlist_table, "playlist", columns, source, order, query, (), self._format_playlist)
 
     def all(self, query=None):
         """Search across all content types (videos, channels, playlists)"""
@@ -168,6 +106,14 @@ class Search:
             return
 
         print(f"Searching all content for: '{query}'")
+        for table in (self.video_table, self.channel_table, self.playlist_table):
+            self._warn_missing_fields(table)
+        if self.count_only:
+            for table in (self.video_table, self.channel_table, self.playlist_table):
+                fts_table = f"{table.database_name}_fts"
+                count = self._count(table, f"FROM {fts_table} WHERE {fts_table} MATCH ?", query)
+                print(f"{table.database_name.capitalize()}: {count}")
+            return
         print("=" * 80)
         
         # Search videos
@@ -218,65 +164,176 @@ class Search:
     def _get_video_search_results(self, query):
         """Helper method to get video search results"""
         sql_query = """
-        SELECT youtube_id, title, channel
-        FROM videos 
-        WHERE title LIKE ? OR description LIKE ? OR tags LIKE ?
-        ORDER BY title
+        SELECT v.youtube_id, v.title, COALESCE(v.channel_name, 'Unknown Channel')
+        FROM videos_fts
+        JOIN videos v ON v.rowid = videos_fts.rowid
+        WHERE videos_fts MATCH ?
+        ORDER BY bm25(videos_fts, 10.0, 1.0, 5.0)
         LIMIT 50
         """
         
-        search_term = f"%{query}%"
-        results = self.video_table.execute(sql_query, (search_term, search_term, search_term))
-        
-        processed_results = []
-        for video_id, title, channel_json in results:
-            channel_name = "Unknown Channel"
-            try:
-                if channel_json:
-                    channel_data = json.loads(channel_json)
-                    channel_name = channel_data.get('channel_name', 'Unknown Channel')
-            except:
-                pass
-            processed_results.append((video_id, title, channel_name))
-        
-        return processed_results
+        return self._match(self.video_table, sql_query, query)
 
     def _get_channel_search_results(self, query):
         """Helper method to get channel search results"""
         sql_query = """
-        SELECT channel_id, channel_name, channel_subscribed
-        FROM channels 
-        WHERE channel_name LIKE ? OR channel_description LIKE ?
-        ORDER BY channel_name
+        SELECT c.channel_id, c.channel_name, c.channel_subscribed
+        FROM channels_fts
+        JOIN channels c ON c.rowid = channels_fts.rowid
+        WHERE channels_fts MATCH ?
+        ORDER BY bm25(channels_fts, 10.0, 1.0)
         LIMIT 20
         """
         
-        search_term = f"%{query}%"
-        return self.channel_table.execute(sql_query, (search_term, search_term))
+        return self._match(self.channel_table, sql_query, query)
 
     def _get_playlist_search_results(self, query):
         """Helper method to get playlist search results"""
-        sql_query = """
-        SELECT playlist_id, playlist_name, playlist_entries
-        FROM playlists 
-        WHERE playlist_name LIKE ? OR playlist_description LIKE ?
-        ORDER BY playlist_name
+        sql_query = f"""
+        SELECT p.playlist_id, p.playlist_name, {self.ENTRY_COUNT}
+        FROM playlists_fts
+        JOIN playlists p ON p.rowid = playlists_fts.rowid
+        WHERE playlists_fts MATCH ?
+        ORDER BY bm25(playlists_fts, 10.0, 1.0)
         LIMIT 20
         """
         
-        search_term = f"%{query}%"
-        results = self.playlist_table.execute(sql_query, (search_term, search_term))
-        
-        processed_results = []
-        for playlist_id, name, entries_json in results:
-            entry_count = 0
-            try:
-                if entries_json:
-                    entries = json.loads(entries_json)
-                    if isinstance(entries, list):
-                        entry_count = len(entries)
-            except:
-                pass
-            processed_results.append((playlist_id, name, entry_count))
-        
-        return processed_results
+        return self._match(self.playlist_table, sql_query, query)
+
+    def _warn_missing_fields(self, table):
+        missing = self.sync_state_table.missing_fields(table, table.SEARCH_COLUMNS)
+        if missing:
+            print(f"Note: {table.database_name} were synced without {', '.join(missing)}, so "
+                  f"{'they are' if len(missing) > 1 else 'it is'} not searched. "
+                  f"Run 'sync {table.database_name} --fields=search' to include them.")
+
+    def _search(self, table, noun, columns, source, order, query, params, format_row):
+        """Stream the requested page of a full-text query's matches to stdout
+
+        Rows are fetched in batches and written in batches, so memory use doesn't
+        grow with the number of matches. Ranking still has to look at every match,
+        but with --limit nothing else does: one extra row tells whether there are
+        more, and matches are only counted for --count-only or an unlimited search.
+        """
+        if self.count_only or self.limit is None:
+            total = self._count(table, source, query, params)
+            if not total:
+                print(f"No {noun}s found matching your search.")
+                return
+            print(f"Found {total} {noun}(s){'.' if self.count_only else ':'}")
+            if self.count_only:
+                return
+        elif not table.match_expression(query):
+            print(f"No {noun}s found matching your search.")
+            return
+
+        rows = table.iterate(
+            f"SELECT {columns} {source} {order} LIMIT ? OFFSET ?",
+            (table.match_expression(query), *params, -1 if self.limit is None else self.limit + 1, self.offset)
+        )
+        if self.limit is None:
+            print("-" * 80)
+            self._write_batched(map(format_row, rows))
+            return
+
+        first = next(rows, None)
+        if first is None:
+            if self.offset:
+                print(f"No {noun}s found past the first {self.offset} matches.")
+            else:
+                print(f"No {noun}s found matching your search.")
+            return
+        print(f"Matching {noun}s:")
+        print("-" * 80)
+        shown = self._write_batched(map(format_row, islice(chain([first], rows), self.limit)))
+        last = self.offset + shown
+        if next(rows, None) is not None:
+            print(f"Showing {self.offset + 1}-{last}. Use --offset={last} to see more.")
+        else:
+            print(f"Showing {self.offset + 1}-{last} of {last}.")
+
+    def _count(self, table, source, query, params=()):
+        """Count a full-text query's matches; source is its FROM ... WHERE ... MATCH ? clause"""
+        match_expression = table.match_expression(query)
+        if not match_expression:
+            return 0
+        (count,), = table.execute(f"SELECT COUNT(*) {source}", (match_expression, *params))
+        return count
+
+    @staticmethod
+    def _write_batched(chunks, batch_size=100):
+        """Write text chunks to stdout a batch at a time instead of one print() per line"""
+        count = 0
+        batch = []
+        for chunk in chunks:
+            batch.append(chunk)
+            count += 1
+            if len(batch) >= batch_size:
+                sys.stdout.write("".join(batch))
+                batch.clear()
+        sys.stdout.write("".join(batch))
+        sys.stdout.flush()
+        return count
+
+    @staticmethod
+    def _format_video(row):
+        video_id, title, published, channel_name, tags, snippet = row
+        lines = [
+            f"Title: {title}",
+            f"ID: {video_id}",
+            f"Channel: {channel_name or 'Unknown Channel'}",
+            f"Published: {published or 'Unknown'}",
+        ]
+        if tags:
+            lines.append(f"Tags: {tags}")  # First 5 tags
+        if snippet:
+            lines.append(f"Match: {snippet}")
+        lines.append("-" * 80)
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _format_channel(row):
+        channel_id, name, description, subscribed, active = row
+        status_indicators = []
+        if subscribed:
+            status_indicators.append("📺 Subscribed")
+        if active:
+            status_indicators.append("✅ Active")
+        else:
+            status_indicators.append("❌ Inactive")
+
+        lines = [f"Name: {name}", f"ID: {channel_id}"]
+        if status_indicators:
+            lines.append(f"Status: {' | '.join(status_indicators)}")
+        if description:
+            # Truncate long descriptions
+            desc = description[:200] + "..." if len(description) > 200 else description
+            lines.append(f"Description: {desc}")
+        lines.append("-" * 80)
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _format_playlist(row):
+        playlist_id, name, description, channel, entry_count, active = row
+        status = "✅ Active" if active else "❌ Inactive"
+
+        lines = [
+            f"Name: {name}",
+            f"ID: {playlist_id}",
+            f"Channel: {channel or 'Unknown'}",
+            f"Entries: {entry_count}",
+            f"Status: {status}",
+        ]
+        if description:
+            # Truncate long descriptions
+            desc = description[:200] + "..." if len(description) > 200 else description
+            lines.append(f"Description: {desc}")
+        lines.append("-" * 80)
+        return "\n".join(lines) + "\n"
+
+    def _match(self, table, sql_query, query, params=()):
+        """Run a full-text query, matching every search word as a prefix"""
+        match_expression = table.match_expression(query)
+        if not match_expression:
+            return []
+        return table.execute(sql_query, (match_expression, *params))
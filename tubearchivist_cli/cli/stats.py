@@ -2,8 +2,9 @@ from tubearchivist_cli.cache.video import VideoTable
 from tubearchivist_cli.cache.playlist import PlaylistTable
 from tubearchivist_cli.cache.channel import ChannelTable
 from tubearchivist_cli.cache.config import ConfigTable
+from tubearchivist_cli.cache.stats import StatsTable
+from tubearchivist_cli.cache.sync_state import SyncStateTable
 import os
-import json
 from pathlib import Path
 
 
@@ -11,10 +12,12 @@ class Stats:
     """Display statistics about cached TubeArchivist data"""
     
     def __init__(self):
-        self.video_table = VideoTable()
-        self.playlist_table = PlaylistTable()
-        self.channel_table = ChannelTable()
-        self.config_table = ConfigTable()
+        self.video_table = VideoTable(readonly=True)
+        self.playlist_table = PlaylistTable(readonly=True)
+        self.channel_table = ChannelTable(readonly=True)
+        self.config_table = ConfigTable(readonly=True)
+        self.stats_table = StatsTable(readonly=True)
+        self.sync_state_table = SyncStateTable(readonly=True)
     
     def overview(self):
         """Display overview statistics of all cached data"""
@@ -87,6 +90,13 @@ class Stats:
         if stats:
             print(f"Subscribed channels: {stats.get('subscribed', 0):,}")
             print(f"Active channels: {stats.get('active', 0):,}")
+        
+        # Per-channel video counts from the indexed channel columns
+        top_channels = self._get_top_channels()
+        if top_channels:
+            print("\nTop channels by cached videos:")
+            for channel_name, video_count, total_size in top_channels:
+                print(f"  {channel_name or 'Unknown Channel'}: {video_count:,} videos, {self._format_bytes(total_size or 0)}")
     
     def playlists(self):
         """Display detailed playlist statistics"""
@@ -130,21 +140,48 @@ class Stats:
         for table in tables:
             count = self._get_table_count(table)
             print(f"  {table}: {count:,} records")
+
+        original_size, stored_size = self.video_table.compression_sizes()
+        if original_size:
+            columns = ", ".join(self.video_table.COMPRESSED_COLUMNS)
+            print(f"\nCompressed video columns ({columns}):")
+            print(f"  {self._format_bytes(original_size)} of JSON stored in {self._format_bytes(stored_size)} "
+                  f"({1 - stored_size / original_size:.0%} smaller)")
     
+    def sync(self):
+        """Display recent sync runs and any interrupted sync"""
+        print("Sync History")
+        print("=" * 20)
+
+        for entity in ['videos', 'channels', 'playlists']:
+            state = self.sync_state_table.get_state(entity)
+            if state and state['status'] == 'running':
+                print(f"Interrupted {entity} sync ({state['mode']}) after page {state['last_page']} "
+                      f"({state['rows']:,} rows); run '{self.sync_state_table.continue_command(state)}' "
+                      "to continue.")
+
+        runs = self.sync_state_table.get_runs()
+        if not runs:
+            print("No finished syncs recorded.")
+            return
+
+        print(f"\n{'Finished':<20} {'Entity':<10} {'Mode':<12} {'Rows':>8} {'Duration':>9} {'Rows/s':>8}")
+        for entity, mode, finished_at, duration, rows, server_total in runs:
+            rate = rows / duration if duration else 0
+            print(f"{self._format_timestamp(finished_at):<20} {entity:<10} {mode:<12} "
+                  f"{rows:>8,} {duration:>8.1f}s {rate:>8,.0f}")
+
     def _get_video_count(self):
         """Get total video count"""
-        result = self.video_table.execute("SELECT COUNT(*) FROM videos")
-        return result[0][0] if result else 0
+        return self.stats_table.get('videos')['count']
     
     def _get_channel_count(self):
         """Get total channel count"""
-        result = self.channel_table.execute("SELECT COUNT(*) FROM channels")
-        return result[0][0] if result else 0
+        return self.stats_table.get('channels')['count']
     
     def _get_playlist_count(self):
         """Get total playlist count"""
-        result = self.playlist_table.execute("SELECT COUNT(*) FROM playlists")
-        return result[0][0] if result else 0
+        return self.stats_table.get('playlists')['count']
     
     def _get_table_count(self, table_name):
         """Get count for any table"""
@@ -157,31 +194,18 @@ class Stats:
     def _get_video_stats(self):
         """Get detailed video statistics"""
         try:
-            # Active/inactive counts
-            active_result = self.video_table.execute("SELECT COUNT(*) FROM videos WHERE active = 1")
-            inactive_result = self.video_table.execute("SELECT COUNT(*) FROM videos WHERE active = 0")
-            
-            # Size statistics
-            size_result = self.video_table.execute(
-                "SELECT SUM(media_size), AVG(media_size) FROM videos WHERE media_size IS NOT NULL AND media_size > 0"
-            )
-            
-            # Latest download
-            latest_result = self.video_table.execute(
-                "SELECT MAX(date_downloaded) FROM videos WHERE date_downloaded IS NOT NULL"
-            )
-            
+            rollup = self.stats_table.get('videos')
             stats = {
-                'active': active_result[0][0] if active_result else 0,
-                'inactive': inactive_result[0][0] if inactive_result else 0
+                'active': rollup['active'],
+                'inactive': rollup['inactive']
             }
             
-            if size_result and size_result[0][0]:
-                stats['total_size'] = int(size_result[0][0])
-                stats['avg_size'] = int(size_result[0][1]) if size_result[0][1] else 0
+            if rollup['total_size']:
+                stats['total_size'] = int(rollup['total_size'])
+                stats['avg_size'] = int(rollup['avg_size']) if rollup['avg_size'] else 0
             
-            if latest_result and latest_result[0][0]:
-                stats['latest_download'] = self._format_timestamp(latest_result[0][0])
+            if rollup['latest_download']:
+                stats['latest_download'] = self._format_timestamp(rollup['latest_download'])
             
             return stats
         except:
@@ -190,43 +214,38 @@ class Stats:
     def _get_channel_stats(self):
         """Get detailed channel statistics"""
         try:
-            subscribed_result = self.channel_table.execute("SELECT COUNT(*) FROM channels WHERE channel_subscribed = 1")
-            active_result = self.channel_table.execute("SELECT COUNT(*) FROM channels WHERE active = 1")
-            
+            rollup = self.stats_table.get('channels')
             return {
-                'subscribed': subscribed_result[0][0] if subscribed_result else 0,
-                'active': active_result[0][0] if active_result else 0
+                'subscribed': rollup['subscribed'],
+                'active': rollup['active']
             }
         except:
             return {}
     
+    def _get_top_channels(self, limit=10):
+        """Get the channels with the most cached videos"""
+        try:
+            return self.video_table.execute("""
+            SELECT channel_name, COUNT(*) AS video_count, SUM(media_size)
+            FROM videos
+            GROUP BY channel_id
+            ORDER BY video_count DESC
+            LIMIT ?
+            """, (limit,))
+        except:
+            return []
+    
     def _get_playlist_stats(self):
         """Get detailed playlist statistics"""
         try:
-            active_result = self.playlist_table.execute("SELECT COUNT(*) FROM playlists WHERE active = 1")
-            
-            # Count playlist entries
-            entries_result = self.playlist_table.execute("SELECT playlist_entries FROM playlists WHERE playlist_entries IS NOT NULL")
-            total_entries = 0
-            playlist_count = 0
-            
-            if entries_result:
-                for row in entries_result:
-                    try:
-                        entries = json.loads(row[0]) if row[0] else []
-                        if isinstance(entries, list):
-                            total_entries += len(entries)
-                            playlist_count += 1
-                    except:
-                        continue
-            
+            rollup = self.stats_table.get('playlists')
             stats = {
-                'active': active_result[0][0] if active_result else 0,
-                'total_entries': total_entries
+                'active': rollup['active'],
+                'total_entries': rollup['total_entries']
             }
             
-            if playlist_count > 0:
-                stats['avg_entries'] = total_entries / playlist_count
+            if rollup['with_entries'] > 0:
+                stats['avg_entries'] = rollup['total_entries'] / rollup['with_entries']
             
             return stats
         except:
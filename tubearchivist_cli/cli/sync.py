@@ -2,48 +2,359 @@ from tubearchivist_cli.api.client import TubeArchivistAPI
 from tubearchivist_cli.cache.video import VideoTable
 from tubearchivist_cli.cache.playlist import PlaylistTable
 from tubearchivist_cli.cache.channel import ChannelTable
+from tubearchivist_cli.cache.stats import StatsTable
+from tubearchivist_cli.cache.lock import CacheLock, LockedError
+from tubearchivist_cli.cache.sync_state import SyncStateTable
+from tubearchivist_cli import metrics
+import asyncio
+import inspect
+import queue
+import sys
+import threading
+import time
+
+
+class EntitySync:
+    """Write the pages of one entity into its cache table and keep count of the changes"""
+
+    def __init__(self, label, table, add_rows, pages, state, page_size, incremental=False,
+                 stop_early=False, checkpoint=None):
+        self.label = label
+        self.table = table
+        self.add_rows = add_rows
+        self.pages = pages
+        self.state = state
+        self.checkpoint = checkpoint
+        self.incremental = incremental
+        self.stop_early = stop_early
+        self.cancelled = threading.Event()
+        self.received = 0
+        self.total = None
+        self.written = 0
+        self.new_count = 0
+        self.changed_count = 0
+        self.complete = True
+        self.started = time.monotonic()
+        self.previous_elapsed = 0
+        self.page = 0
+
+        if checkpoint:
+            # Pick up after the last committed page of an interrupted full sync
+            self.written = checkpoint['rows']
+            self.previous_elapsed = checkpoint['elapsed']
+            self.page = checkpoint['last_page']
+            state.resume(label)
+        else:
+            state.start(label, "incremental" if incremental else "full", page_size, table.fields)
+            if incremental:
+                self.cached = table.get_refresh_index()
+                self.seen = set()
+        if not incremental:
+            # Full syncs fill a shadow table; readers keep the previous snapshot until the swap
+            table.begin_staging(resume=bool(checkpoint))
+
+    @property
+    def elapsed(self):
+        return self.previous_elapsed + time.monotonic() - self.started
+
+    def handle(self, page):
+        """Write one page, returning False once the remaining pages can be skipped"""
+        paginate = page.get('paginate', {})
+        self.received += len(page['data'])
+        self.page = paginate.get('current_page', self.page + 1)
+        server_total = self.checkpoint and self.checkpoint['server_total']
+        if server_total is not None and self.total is None and paginate.get('total_hits') != server_total:
+            print(f"Warning: the server's {self.label} changed since the interrupted sync; "
+                  f"run 'sync {self.label} --incremental' afterwards to catch up.")
+        self.total = paginate.get('total_hits', self.total)
+        if not self.incremental:
+            self.written += self.add_rows(page['data'])
+            self.state.checkpoint(self.label, self.page, self.total, self.written, self.elapsed)
+            return True
+
+        changed = []
+        for item in page['data']:
+            row_id = item.get(self.table.ID_COLUMN)
+            self.seen.add(row_id)
+            cached_key = self.cached.get(row_id)
+            if cached_key is None:
+                self.new_count += 1
+            elif cached_key == self.table.refresh_key(item.get(self.table.REFRESH_COLUMN), item.get('date_downloaded')):
+                continue
+            else:
+                self.changed_count += 1
+            changed.append(item)
+        self.add_rows(changed)
+        self.written += len(changed)
+        self.state.checkpoint(self.label, self.page, self.total, self.written, self.elapsed)
+
+        # An unchanged page means everything older is unchanged too; if the server
+        # total also matches the cache there is nothing left to add or delete
+        if self.stop_early and not changed and self.total == len(self.cached) + self.new_count:
+            self.complete = False
+            return False
+        return True
+
+    def finish(self):
+        """Delete rows that disappeared server-side, record the run and report the outcome"""
+        if not self.incremental:
+            self.table.swap_staging()
+            self.state.finish(self.label, self.written, self.elapsed)
+            print(f"Synced {self.written} {self.label} to local cache in {self.elapsed:.1f}s.")
+            return
+
+        removed_count = 0
+        if self.complete:
+            removed_count = self.table.delete_ids([row_id for row_id in self.cached if row_id not in self.seen])
+        self.state.finish(self.label, self.written + removed_count, self.elapsed)
+        print(f"Synced {self.label}: {self.new_count} new, {self.changed_count} changed, "
+              f"{removed_count} removed in {self.elapsed:.1f}s.")
 
 
 class Sync:
     """Synchronize data from TubeArchivist API to local cache"""
 
-    def __init__(self):
-        self.client = TubeArchivistAPI()
-        self.video_table = VideoTable()
+    # The methods the CLI may call as `sync <action>`
+    ACTIONS = ("videos", "playlists", "channels", "all")
+
+    def __init__(self, client=None, incremental=False, resume=False, queue_depth=8, compression=None,
+                 fields=None):
+        if incremental and resume:
+            print("--resume only applies to full syncs; running an incremental sync instead.")
+        self.incremental = incremental
+        self.resume = resume and not incremental
+        self.queue_depth = queue_depth
+        self.fields = fields
+        self.client = client or TubeArchivistAPI()
+        self.video_table = VideoTable(compression=compression)
         self.playlist_table = PlaylistTable()
         self.channel_table = ChannelTable()
+        self.stats_table = StatsTable()
+        self.state_table = SyncStateTable()
+        self.show_progress = sys.stdout.isatty()
+        # Entities the current run started, for resume_hints()
+        self.labels = []
 
     def videos(self):
         """Sync all videos from TubeArchivist to local cache"""
-        print("Syncing videos...")
-        self.video_table.clear_table()
-        videos = self.client.get_all_videos()
-        for video in videos:
-            self.video_table.add_video(video)
-        print(f"Synced {len(videos)} videos to local cache.")
+        self._run([self._videos_job])
 
     def playlists(self):
         """Sync all playlists from TubeArchivist to local cache"""
-        print("Syncing playlists...")
-        self.playlist_table.clear_table()
-        playlists = self.client.get_all_playlists()
-        for playlist in playlists:
-            self.playlist_table.add_playlist(playlist)
-        print(f"Synced {len(playlists)} playlists to local cache.")
+        self._run([self._playlists_job])
 
     def channels(self):
         """Sync all channels from TubeArchivist to local cache"""
-        print("Syncing channels...")
-        self.channel_table.clear_table()
-        channels = self.client.get_all_channels()
-        for channel in channels:
-            self.channel_table.add_channel(channel)
-        print(f"Synced {len(channels)} channels to local cache.")
+        self._run([self._channels_job])
 
     def all(self):
         """Sync all data (videos, playlists, channels) from TubeArchivist"""
         print("Syncing all data (videos, playlists, channels)...")
-        self.videos()
-        self.playlists()
-        self.channels()
-        print("All data synced successfully.")
+        started = time.monotonic()
+        # The entities are independent, so their pages download side by side
+        if self._run([self._videos_job, self._playlists_job, self._channels_job]):
+            print(f"All data synced successfully in {time.monotonic() - started:.1f}s.")
+        else:
+            print("Nothing was resumed.")
+
+    def _videos_job(self):
+        if self.incremental:
+            # Newest downloads come first, so paging can stop at the first unchanged page
+            return self._job("videos", self.video_table, self.video_table.add_videos,
+                             self.client.get_all_videos, stop_early=True, sort="downloaded", order="desc")
+        return self._job("videos", self.video_table, self.video_table.add_videos, self.client.get_all_videos)
+
+    def _playlists_job(self):
+        return self._job("playlists", self.playlist_table, self.playlist_table.add_playlists,
+                         self.client.get_all_playlists)
+
+    def _channels_job(self):
+        return self._job("channels", self.channel_table, self.channel_table.add_channels,
+                         self.client.get_all_channels)
+
+    def _job(self, label, table, add_rows, get_all, stop_early=False, **filters):
+        """Set up an entity's sync, or return None when resuming and it has nothing to resume"""
+        checkpoint = None
+        if self.resume:
+            checkpoint = self.state_table.get_state(label)
+            if not checkpoint or checkpoint['status'] != 'running' or checkpoint['mode'] == 'incremental':
+                print(f"No interrupted {label} sync to resume.")
+                return None
+            if checkpoint['page_size'] != self.client.page_size:
+                print(f"The page size changed since the interrupted {label} sync; starting over.")
+                checkpoint = None
+            elif not table.has_staging():
+                print(f"The interrupted {label} sync left no staged rows; starting over.")
+                checkpoint = None
+            else:
+                print(f"Resuming {label} after page {checkpoint['last_page']} "
+                      f"({checkpoint['rows']} rows already staged).")
+
+        table.use_fields(self._fields(label, checkpoint))
+        start_page = checkpoint['last_page'] + 1 if checkpoint else 1
+        return EntitySync(label, table, add_rows, get_all(start_page=start_page, **filters), self.state_table,
+                          self.client.page_size, incremental=self.incremental, stop_early=stop_early,
+                          checkpoint=checkpoint)
+
+    def resume_hints(self):
+        """Describe how to continue each entity of the last run that didn't finish"""
+        hints = []
+        for label in self.labels:
+            state = self.state_table.get_state(label)
+            if state and state['status'] == 'running':
+                hints.append(f"{label.capitalize()} sync interrupted at page {state['last_page'] + 1}; "
+                             f"run '{self.state_table.continue_command(state)}' to continue.")
+        return hints
+
+    def _fields(self, label, checkpoint):
+        """Pick the field profile for an entity: only a fresh full sync can change what the cache stores"""
+        if checkpoint:
+            current, reason = checkpoint['fields'] or "full", "the interrupted sync being resumed"
+        elif self.incremental:
+            current, reason = self.state_table.get_fields(label), "the cached rows"
+        else:
+            return self.fields or "full"
+        if self.fields and self.fields != current:
+            print(f"Keeping the '{current}' field profile of {reason} for {label}; "
+                  f"run a full sync to switch to '{self.fields}'.")
+        return current
+
+    def _run(self, make_jobs):
+        """Set up the jobs and run them while holding the cache's sync lock
+
+        Another sync on the same cache would drop the staging tables this one is
+        filling, so a second sync (or a --resume while the first is still alive)
+        is refused rather than left to wait.
+        """
+        try:
+            lock = CacheLock(self.video_table.database_path).acquire()
+        except LockedError as e:
+            raise LockedError(f"Another sync of this cache is already running ({e}). "
+                              "Wait for it to finish before starting a new one.") from None
+        try:
+            return self._run_jobs([make_job() for make_job in make_jobs])
+        finally:
+            lock.release()
+
+    def _run_jobs(self, jobs):
+        """Fetch every job's pages concurrently while this thread does all the cache writes
+
+        Returns False if there was no job to run (a --resume with nothing to resume).
+        """
+        jobs = [job for job in jobs if job]
+        self.labels = [job.label for job in jobs]
+        if not jobs:
+            return False
+        for job in jobs:
+            print(f"Syncing {job.label}...")
+
+        if inspect.isasyncgen(jobs[0].pages):
+            self.client.run(self._run_async(jobs))
+            return True
+
+        for job, page in self._stream(jobs):
+            if page is None:
+                self._finish(job)
+            elif not job.cancelled.is_set() and self._handle(job, page) is False:
+                job.cancelled.set()
+            self._report_progress(jobs)
+        return True
+
+    async def _run_async(self, jobs):
+        """Consume every job's pages on the async client's event loop
+
+        Writes happen between awaits on the loop's thread, so they are
+        serialized without a hand-off queue.
+        """
+        async def consume(job):
+            try:
+                async for page in job.pages:
+                    if self._handle(job, page) is False:
+                        break
+                    self._report_progress(jobs)
+            finally:
+                await job.pages.aclose()
+            self._finish(job)
+
+        tasks = [asyncio.ensure_future(consume(job)) for job in jobs]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _handle(self, job, page):
+        with metrics.phase("sync.write_page"):
+            return job.handle(page)
+
+    def _finish(self, job):
+        if self.show_progress:
+            print("\r\033[K", end="")
+        with metrics.phase("sync.finish"):
+            job.finish()
+            self.stats_table.refresh(job.label)
+
+    def _report_progress(self, jobs):
+        if not self.show_progress:
+            return
+        status = " | ".join(f"{job.label} {job.received}/{job.total if job.total is not None else '?'}"
+                            for job in jobs)
+        print(f"\r\033[K{status}", end="", flush=True)
+
+    def _stream(self, jobs):
+        """Fetch each job's pages on its own thread and hand them over through one bounded queue
+
+        Yields (job, page) pairs, then (job, None) once a job's pages run out.
+        Only up to queue_depth pages are held in memory at once, and the caller
+        (which owns the SQLite connection) writes while the next pages download.
+        """
+        page_queue = queue.Queue(maxsize=self.queue_depth)
+        stopped = threading.Event()
+
+        def put(job, item):
+            # Time spent here means the writer is the bottleneck
+            with metrics.phase("sync.wait_for_writer"):
+                while not stopped.is_set() and not job.cancelled.is_set():
+                    try:
+                        page_queue.put((job, item), timeout=0.1)
+                        return
+                    except queue.Full:
+                        continue
+
+        def fetch(job):
+            try:
+                for page in job.pages:
+                    put(job, page)
+                    if stopped.is_set() or job.cancelled.is_set():
+                        break
+            except Exception as e:
+                put(job, e)
+            finally:
+                job.pages.close()
+                # Cancelled jobs still report completion so the consumer can finish them
+                if not stopped.is_set():
+                    page_queue.put((job, None))
+
+        fetchers = [threading.Thread(target=fetch, args=(job,), daemon=True) for job in jobs]
+        for fetcher in fetchers:
+            fetcher.start()
+        try:
+            remaining = len(jobs)
+            while remaining:
+                # Time spent here means the server or the network is the bottleneck
+                with metrics.phase("sync.wait_for_pages"):
+                    job, page = page_queue.get()
+                if isinstance(page, Exception):
+                    raise page
+                if page is None:
+                    remaining -= 1
+                yield job, page
+        finally:
+            stopped.set()
+            # Unblock fetchers waiting on a full queue so they can shut down
+            while any(fetcher.is_alive() for fetcher in fetchers):
+                try:
+                    page_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
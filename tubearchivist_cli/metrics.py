@@ -0,0 +1,165 @@
+"""Phase timers, counters and latency samples for the --metrics and --profile options
+
+Instrumented code across the API client, cache and CLI calls count(), observe()
+and phase(); they cost about a microsecond, so they stay on all the time. Phase
+timers are summed across threads, so phases that run in parallel (e.g. page
+fetches during a sync) can add up to more than the wall time.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_counters = {}
+_timers = {}
+_latencies = {}
+
+
+class Latency:
+    """Running summary of latency samples in constant memory, however many are observed
+
+    Percentiles come from a log-scale histogram whose buckets grow by 5%, so they
+    are accurate to within 5%; count, total and max are exact.
+    """
+    BASE = 0.0001  # 0.1 ms; anything faster shares the first bucket
+    GROWTH = 1.05
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = {}
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        bucket = 0 if seconds <= self.BASE else math.ceil(math.log(seconds / self.BASE, self.GROWTH))
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the sample at `fraction`, in seconds"""
+        rank = min(self.count - 1, int(self.count * fraction))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen > rank:
+                return min(self.max, self.BASE * self.GROWTH ** bucket)
+        return self.max
+
+
+def count(name, amount=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def add_time(name, seconds):
+    with _lock:
+        total, calls = _timers.get(name, (0.0, 0))
+        _timers[name] = (total + seconds, calls + 1)
+
+
+def observe(name, seconds):
+    """Record one latency sample, e.g. of an HTTP request"""
+    with _lock:
+        latency = _latencies.get(name)
+        if latency is None:
+            latency = _latencies[name] = Latency()
+        latency.add(seconds)
+
+
+@contextmanager
+def phase(name):
+    """Add the time spent in the block to the `name` timer"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(name, time.perf_counter() - started)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _timers.clear()
+        _latencies.clear()
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process, or None where the resource module is missing"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    import sys
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def report(command=None, wall_seconds=None):
+    """Collect everything recorded so far into a JSON-serializable dict"""
+    peak = peak_memory_mb()
+    with _lock:
+        latency = {}
+        for name, summary in sorted(_latencies.items()):
+            latency[name] = {
+                "count": summary.count,
+                "total_s": round(summary.total, 4),
+                "p50_ms": round(summary.percentile(0.50) * 1000, 2),
+                "p99_ms": round(summary.percentile(0.99) * 1000, 2),
+                "max_ms": round(summary.max * 1000, 2),
+            }
+        return {
+            "command": command,
+            "wall_s": round(wall_seconds, 4) if wall_seconds is not None else None,
+            "peak_memory_mb": round(peak, 1) if peak is not None else None,
+            "phases": {name: {"seconds": round(seconds, 4), "calls": calls}
+                       for name, (seconds, calls) in sorted(_timers.items())},
+            "counters": dict(sorted(_counters.items())),
+            "latency": latency,
+        }
+
+
+def profile(function, path):
+    """Run function() under cProfile and write the stats to `path`
+
+    Threads started while it runs (sync's page fetchers, redownload workers) are
+    profiled as well: before Python 3.12 each gets a profiler of its own, merged
+    into the same file; from 3.12 cProfile uses sys.monitoring, which already
+    sees every thread.
+    """
+    import cProfile
+    import pstats
+    import sys
+
+    thread_profilers = []
+
+    def start_thread_profiler(*args):
+        # Called on the first profiling event in each new thread; the profiler replaces this hook
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool is active; drop the hook rather than kill the thread
+            sys.setprofile(None)
+            return
+        with _lock:
+            thread_profilers.append(profiler)
+
+    per_thread = sys.version_info < (3, 12)
+    profiler = cProfile.Profile()
+    if per_thread:
+        threading.setprofile(start_thread_profiler)
+    profiler.enable()
+    try:
+        return function()
+    finally:
+        profiler.disable()
+        if per_thread:
+            threading.setprofile(None)
+        stats = pstats.Stats(profiler)
+        for thread_profiler in thread_profilers:
+            stats.add(thread_profiler)
+        stats.dump_stats(path)